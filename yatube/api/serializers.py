@@ -0,0 +1,107 @@
+"""Компактная сериализация моделей в словари для JSON API.
+
+Каждое поле описывает, как получить значение, какие колонки нужны
+из базы и какие связи подтягивать. По списку запрошенных полей
+(?fields=) запрос ограничивается через only() и select_related(),
+поэтому ненужные колонки и JOIN не выполняются.
+"""
+from operator import attrgetter
+from typing import Callable, NamedTuple
+
+from posts.counters import get_user_stats
+
+
+class Field(NamedTuple):
+    get: Callable
+    columns: tuple = ()
+    related: tuple = ()
+
+
+class InvalidFields(Exception):
+    pass
+
+
+def isoformat(name):
+    getter = attrgetter(name)
+    return lambda obj: getter(obj).isoformat()
+
+
+POST_FIELDS = {
+    'id': Field(attrgetter('pk'), ('id',)),
+    'text': Field(attrgetter('text'), ('text',)),
+    'pub_date': Field(isoformat('pub_date'), ('pub_date',)),
+    'author': Field(
+        lambda post: post.author.username,
+        ('author__username',),
+        ('author',),
+    ),
+    'group': Field(
+        lambda post: post.group.slug if post.group_id else None,
+        ('group__slug',),
+        ('group',),
+    ),
+    'image': Field(
+        lambda post: post.image.url if post.image else None, ('image',)
+    ),
+    'comments_count': Field(attrgetter('comments_count'), ('comments_count',)),
+}
+
+COMMENT_FIELDS = {
+    'id': Field(attrgetter('pk'), ('id',)),
+    'text': Field(attrgetter('text'), ('text',)),
+    'created': Field(isoformat('created'), ('created',)),
+    'author': Field(
+        lambda comment: comment.author.username,
+        ('author__username',),
+        ('author',),
+    ),
+}
+
+GROUP_FIELDS = {
+    'slug': Field(attrgetter('slug')),
+    'title': Field(attrgetter('title')),
+    'description': Field(attrgetter('description')),
+}
+
+PROFILE_FIELDS = {
+    'username': Field(attrgetter('username')),
+    'full_name': Field(lambda user: user.get_full_name()),
+    'posts_count': Field(lambda user: get_user_stats(user).posts_count),
+    'followers_count': Field(
+        lambda user: get_user_stats(user).followers_count
+    ),
+    'following_count': Field(
+        lambda user: get_user_stats(user).following_count
+    ),
+}
+
+
+def parse_fields(value, spec):
+    """Список полей из ?fields=; без параметра — все поля."""
+    if not value:
+        return list(spec)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in spec]
+    if unknown or not fields:
+        raise InvalidFields(', '.join(unknown))
+    return fields
+
+
+def restrict(queryset, spec, fields, ordering=()):
+    """Запрос только с колонками и связями запрошенных полей.
+
+    Поля сортировки выбираются всегда — по ним строится курсор.
+    """
+    columns = {
+        column for field in fields for column in spec[field].columns
+    }
+    columns |= {name.lstrip('-') for name in ordering}
+    related = {name for field in fields for name in spec[field].related}
+    queryset = queryset.select_related(None)
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*columns)
+
+
+def serialize(obj, spec, fields):
+    return {field: spec[field].get(obj) for field in fields}
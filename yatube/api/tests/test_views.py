@@ -0,0 +1,134 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='author', first_name='Имя', last_name='Фамилия'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, text=f'Пост {i}', group=cls.group
+            )
+            for i in range(12)
+        ]
+        cls.post = cls.posts[-1]
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        self.client = Client()
+
+    def get_json(self, url, status=200, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return response.json()
+
+    def test_post_lists(self):
+        """Списки постов отдаются страницами по курсору."""
+        newest = [post.pk for post in self.posts[::-1]]
+        self.client.force_login(self.reader)
+        urls = (
+            reverse('api:post_list'),
+            reverse('api:group_posts', kwargs={'slug': 'test-slug'}),
+            reverse('api:profile_posts', kwargs={'username': 'author'}),
+            reverse('api:follow_posts'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.get_json(url)
+                ids = [post['id'] for post in data['results']]
+                self.assertEqual(ids, newest[:10])
+                self.assertIsNone(data['previous'])
+                data = self.get_json(url, cursor=data['next'])
+                ids = [post['id'] for post in data['results']]
+                self.assertEqual(ids, newest[10:])
+                self.assertIsNone(data['next'])
+
+    def test_post_detail(self):
+        data = self.get_json(
+            reverse('api:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertEqual(data, {
+            'id': self.post.pk,
+            'text': self.post.text,
+            'pub_date': self.post.pub_date.isoformat(),
+            'author': 'author',
+            'group': 'test-slug',
+            'image': None,
+            'comments_count': 1,
+        })
+
+    def test_sparse_fields_skip_columns_and_joins(self):
+        url = reverse('api:post_list')
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get_json(url, fields='id,text', limit=2)
+        self.assertEqual(
+            data['results'][0], {'id': self.post.pk, 'text': self.post.text}
+        )
+        sql = queries[-1]['sql']
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('"image"', sql)
+        data = self.get_json(url, status=400, fields='id,password')
+        self.assertIn('password', data['detail'])
+
+    def test_comments_group_and_profile(self):
+        data = self.get_json(
+            reverse('api:post_comments', kwargs={'post_id': self.post.pk})
+        )
+        self.assertEqual(
+            [(c['author'], c['text']) for c in data['results']],
+            [('reader', 'Комментарий')],
+        )
+        data = self.get_json(
+            reverse('api:group_detail', kwargs={'slug': 'test-slug'})
+        )
+        self.assertEqual(data['title'], 'Тестовая группа')
+        data = self.get_json(
+            reverse('api:profile', kwargs={'username': 'author'}),
+            fields='full_name,posts_count,followers_count',
+        )
+        self.assertEqual(data, {
+            'full_name': 'Имя Фамилия',
+            'posts_count': 12,
+            'followers_count': 1,
+        })
+
+    def test_errors(self):
+        self.get_json(reverse('api:follow_posts'), status=401)
+        self.get_json(
+            reverse('api:post_detail', kwargs={'post_id': 999}), status=404
+        )
+        self.get_json(
+            reverse('api:group_posts', kwargs={'slug': 'missing'}),
+            status=404,
+        )
+        response = self.client.post(reverse('api:post_list'))
+        self.assertEqual(response.status_code, 405)
+
+    @mock.patch('posts.conditional.is_shared', return_value=True)
+    def test_conditional_get(self, is_shared):
+        url = reverse('api:post_detail', kwargs={'post_id': self.post.pk})
+        response = self.client.get(url)
+        response = self.client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,163 @@
+"""JSON API только для чтения.
+
+Запросы те же, что у HTML-страниц (with_related(), лента подписок,
+курсорная пагинация), но без рендеринга шаблонов: модели сразу
+превращаются в словари с полями из ?fields=. ETag и Last-Modified
+считаются теми же валидаторами, что и для страниц.
+"""
+from functools import wraps
+
+from django.http import JsonResponse
+from django.views.decorators.http import condition, require_safe
+
+from posts.conditional import feed_etag, post_last_modified
+from posts.models import Group, Post, User
+from posts.timeline import timeline_page
+from posts.utils import (
+    COMMENT_ORDERINGS, FEED_ORDERING, comments_paginator, cursor_paginate,
+)
+from posts.views import COMMENTS_PER_PAGE, NUM_OF_P
+
+from .serializers import (
+    COMMENT_FIELDS, GROUP_FIELDS, POST_FIELDS, PROFILE_FIELDS,
+    InvalidFields, parse_fields, restrict, serialize,
+)
+
+MAX_LIMIT = 100
+
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+class ApiError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def api_view(etag_func=None, last_modified_func=None):
+    """JSON-ответ с поддержкой условных GET.
+
+    Представление возвращает словарь; ApiError превращается в ответ
+    с ошибкой.
+    """
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            try:
+                data = view(request, *args, **kwargs)
+            except ApiError as error:
+                return JsonResponse(
+                    {'detail': error.detail},
+                    status=error.status,
+                    json_dumps_params=JSON_PARAMS,
+                )
+            return JsonResponse(data, json_dumps_params=JSON_PARAMS)
+        return require_safe(condition(
+            etag_func=etag_func, last_modified_func=last_modified_func
+        )(inner))
+    return decorator
+
+
+def get_or_404(queryset, **lookup):
+    obj = queryset.filter(**lookup).first()
+    if obj is None:
+        raise ApiError(404, 'Не найдено.')
+    return obj
+
+
+def get_fields(request, spec):
+    try:
+        return parse_fields(request.GET.get('fields'), spec)
+    except InvalidFields as error:
+        raise ApiError(400, f'Неизвестные поля: {error}')
+
+
+def get_limit(request, default):
+    try:
+        limit = int(request.GET.get('limit', default))
+    except ValueError:
+        raise ApiError(400, 'limit должен быть числом.')
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def page_data(page_obj, spec, fields):
+    return {
+        'results': [serialize(obj, spec, fields) for obj in page_obj],
+        'next': page_obj.next_cursor,
+        'previous': page_obj.previous_cursor,
+    }
+
+
+def posts_page(request, posts):
+    fields = get_fields(request, POST_FIELDS)
+    posts = restrict(posts, POST_FIELDS, fields, FEED_ORDERING)
+    page_obj = cursor_paginate(request, posts, get_limit(request, NUM_OF_P))
+    return page_data(page_obj, POST_FIELDS, fields)
+
+
+@api_view(etag_func=feed_etag)
+def post_list(request):
+    return posts_page(request, Post.objects.with_related())
+
+
+@api_view(etag_func=feed_etag)
+def group_posts(request, slug):
+    group = get_or_404(Group.objects.all(), slug=slug)
+    return posts_page(request, group.posts.with_related())
+
+
+@api_view(etag_func=feed_etag)
+def profile_posts(request, username):
+    author = get_or_404(User.objects.all(), username=username)
+    return posts_page(request, author.posts.with_related())
+
+
+@api_view(etag_func=feed_etag)
+def follow_posts(request):
+    if not request.user.is_authenticated:
+        raise ApiError(401, 'Нужна авторизация.')
+    fields = get_fields(request, POST_FIELDS)
+    page_obj = timeline_page(
+        request, get_limit(request, NUM_OF_P), cursor_only=True
+    )
+    return page_data(page_obj, POST_FIELDS, fields)
+
+
+@api_view(etag_func=feed_etag, last_modified_func=post_last_modified)
+def post_detail(request, post_id):
+    fields = get_fields(request, POST_FIELDS)
+    posts = restrict(Post.objects.with_related(), POST_FIELDS, fields)
+    return serialize(get_or_404(posts, pk=post_id), POST_FIELDS, fields)
+
+
+@api_view(etag_func=feed_etag, last_modified_func=post_last_modified)
+def post_comments(request, post_id):
+    post = get_or_404(Post.objects.only('pk'), pk=post_id)
+    fields = get_fields(request, COMMENT_FIELDS)
+    comments = restrict(
+        post.comments.with_related(),
+        COMMENT_FIELDS,
+        fields,
+        COMMENT_ORDERINGS['old'],
+    )
+    page_obj = comments_paginator(
+        request, comments, get_limit(request, COMMENTS_PER_PAGE)
+    ).get_page(request.GET.get('cursor'))
+    return page_data(page_obj, COMMENT_FIELDS, fields)
+
+
+@api_view(etag_func=feed_etag)
+def group_detail(request, slug):
+    fields = get_fields(request, GROUP_FIELDS)
+    group = get_or_404(Group.objects.all(), slug=slug)
+    return serialize(group, GROUP_FIELDS, fields)
+
+
+@api_view(etag_func=feed_etag)
+def profile(request, username):
+    fields = get_fields(request, PROFILE_FIELDS)
+    author = get_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    return serialize(author, PROFILE_FIELDS, fields)
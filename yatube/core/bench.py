@@ -0,0 +1,35 @@
+"""Общие помощники команд bench_*: перцентили и запросы к WSGI."""
+import io
+import sys
+from urllib.parse import urlencode
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def wsgi_environ(url, method='GET', data=None, cookies=None):
+    """Окружение WSGI для запроса к приложению без сервера."""
+    path, _, query = url.partition('?')
+    body = urlencode(data or {}).encode()
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.url_scheme': 'http',
+    }
+    if data is not None:
+        environ['CONTENT_TYPE'] = 'application/x-www-form-urlencoded'
+    if cookies:
+        environ['HTTP_COOKIE'] = '; '.join(
+            f'{name}={value}' for name, value in cookies.items()
+        )
+    return environ
@@ -0,0 +1,77 @@
+"""Счётчики поколений для инвалидации кэша.
+
+Вместо удаления закэшированных фрагментов в ключ кэша добавляется номер
+поколения: изменение данных увеличивает номер, и старые фрагменты
+просто перестают читаться, а затем вытесняются по TTL.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+FEED = 'feed'
+
+# Меняется, когда готовы новые превью картинок.
+THUMBNAILS = 'thumbnails'
+
+KEY_PREFIX = 'generation'
+
+# Бэкенды, данные которых видит только свой процесс.
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def _key(name):
+    return f'{KEY_PREFIX}:{name}'
+
+
+def _initial():
+    # Начальное значение зависит от времени, чтобы после очистки кэша
+    # номера не повторялись и не совпадали со старыми ETag.
+    return int(time.time() * 1000)
+
+
+def get_generation(name=FEED):
+    key = _key(name)
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, _initial(), timeout=None)
+        value = cache.get(key)
+    return value
+
+
+def get_generations(names):
+    """Номера поколений для нескольких имён — одним get_many."""
+    keys = {_key(name): name for name in names}
+    found = cache.get_many(keys)
+    for key in keys.keys() - found.keys():
+        cache.add(key, _initial(), timeout=None)
+        found[key] = cache.get(key)
+    return {keys[key]: value for key, value in found.items()}
+
+
+def bump_generation(*names):
+    for name in names or (FEED,):
+        key = _key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial(), timeout=None)
+
+
+def is_shared(alias='default'):
+    """Видят ли записи в кэш другие процессы, например воркер очереди."""
+    return not isinstance(caches[alias], PROCESS_LOCAL_BACKENDS)
+
+
+def feed_timeout():
+    """TTL фрагментов лент.
+
+    Смену поколения видят все процессы только в общем кэше. В кэше
+    памяти процесса сохранение в одном воркере не сбросит фрагменты
+    других, поэтому там они живут не дольше FEED_CACHE_LOCAL_TIMEOUT.
+    """
+    if is_shared():
+        return settings.FEED_CACHE_TIMEOUT
+    return settings.FEED_CACHE_LOCAL_TIMEOUT
@@ -0,0 +1,306 @@
+"""Кэш в файле SQLite, общий для всех процессов на одном хосте.
+
+LocMemCache у каждого воркера gunicorn свой, поэтому попадания делятся
+на число воркеров, а счётчики поколений (core.cache) в разных процессах
+расходятся. Этот бэкенд хранит данные в одном файле SQLite в режиме WAL:
+чтения идут параллельно, запись сериализует сама SQLite.
+
+Параметры OPTIONS:
+    MAX_ENTRIES, CULL_FREQUENCY — как у стандартных бэкендов;
+    MAX_SIZE — предел суммарного размера значений в байтах;
+    LRU_RESOLUTION — как часто (в секундах) обновлять время обращения.
+
+Вытеснение — LRU: сначала удаляются просроченные записи, затем те,
+к которым дольше всего не обращались.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL,'
+    ' size INTEGER NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+)
+
+ALIVE = '(expires IS NULL OR expires > ?)'
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = int(options.get('MAX_SIZE', 0))
+        self._lru_resolution = float(options.get('LRU_RESOLUTION', 10))
+        # Полный подсчёт записей дорог, поэтому проверка переполнения
+        # выполняется не на каждой записи, а раз в CULL_CHECK_EVERY.
+        self._cull_check_every = int(options.get('CULL_CHECK_EVERY', 16))
+        self._local = threading.local()
+        self._writes = 0
+
+    @property
+    def _connection(self):
+        local = self._local
+        # После fork соединение родителя использовать нельзя.
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self._path, timeout=30, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    def _encode(self, value):
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _decode(self, value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    def _size(self, value):
+        return 8 if isinstance(value, int) else len(value)
+
+    def _write(self, sql, params):
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = connection.execute(sql, params)
+            changed = cursor.rowcount
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        self._maybe_cull()
+        return changed
+
+    def _maybe_cull(self):
+        self._writes += 1
+        if self._writes % self._cull_check_every:
+            return
+        self._cull()
+
+    def _cull(self):
+        connection = self._connection
+        now = time.time()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute(
+                'DELETE FROM cache WHERE expires <= ?', (now,)
+            )
+            count, size = connection.execute(
+                'SELECT count(*), total(size) FROM cache'
+            ).fetchone()
+            excess = 0
+            # Как и стандартные бэкенды, при переполнении освобождаем
+            # 1/CULL_FREQUENCY места (0 — очистить всё).
+            keep = 0
+            if self._cull_frequency:
+                keep = self._max_entries - (
+                    self._max_entries // self._cull_frequency
+                )
+            if count > self._max_entries:
+                excess = count - keep
+            if self._max_size and size > self._max_size:
+                excess = max(excess, count // (self._cull_frequency or 1))
+            if excess:
+                connection.execute(
+                    'DELETE FROM cache WHERE key IN ('
+                    ' SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                    (excess,),
+                )
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def _store(self, key, value, timeout, only_if_missing=False):
+        encoded = self._encode(value)
+        now = time.time()
+        params = (
+            key, encoded, self.get_backend_timeout(timeout), now,
+            self._size(encoded),
+        )
+        sql = (
+            'INSERT INTO cache (key, value, expires, accessed, size) '
+            'VALUES (?, ?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET '
+            'value = excluded.value, expires = excluded.expires, '
+            'accessed = excluded.accessed, size = excluded.size'
+        )
+        if only_if_missing:
+            sql += (
+                ' WHERE cache.expires IS NOT NULL AND cache.expires <= ?'
+            )
+            params += (now,)
+        return self._write(sql, params)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return bool(self._store(key, value, timeout, only_if_missing=True))
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._store(key, value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        rows = []
+        for key, value in data.items():
+            encoded = self._encode(value)
+            rows.append((
+                self.make_and_validate_key(key, version=version),
+                encoded, expires, now, self._size(encoded),
+            ))
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache '
+                '(key, value, expires, accessed, size) '
+                'VALUES (?, ?, ?, ?, ?)',
+                rows,
+            )
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        self._maybe_cull()
+        return []
+
+    def _touch_accessed(self, keys, now):
+        self._connection.execute(
+            'UPDATE cache SET accessed = ? WHERE key IN (%s)'
+            % ', '.join('?' * len(keys)),
+            (now, *keys),
+        )
+
+    def _fetch(self, keys):
+        """Живые значения по ключам; заодно обновляет время обращения."""
+        now = time.time()
+        rows = self._connection.execute(
+            'SELECT key, value, accessed FROM cache '
+            'WHERE key IN (%s) AND %s' % (', '.join('?' * len(keys)), ALIVE),
+            (*keys, now),
+        ).fetchall()
+        stale = [
+            key for key, _, accessed in rows
+            if now - accessed > self._lru_resolution
+        ]
+        if stale:
+            try:
+                self._touch_accessed(stale, now)
+            except sqlite3.OperationalError:
+                # Время обращения — подсказка для вытеснения; если база
+                # занята записью, его можно не обновлять.
+                pass
+        return {key: self._decode(value) for key, value, _ in rows}
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._fetch([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        if not keys:
+            return {}
+        key_map = {
+            self.make_and_validate_key(key, version=version): key
+            for key in keys
+        }
+        found = self._fetch(list(key_map))
+        return {key_map[key]: value for key, value in found.items()}
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection.execute(
+            'SELECT 1 FROM cache WHERE key = ? AND ' + ALIVE,
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        return bool(self._write(
+            'UPDATE cache SET expires = ?, accessed = ? '
+            'WHERE key = ? AND ' + ALIVE,
+            (self.get_backend_timeout(timeout), now, key, now),
+        ))
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарное приращение: один UPDATE ... RETURNING."""
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                "UPDATE cache SET value = value + ?, accessed = ? "
+                "WHERE key = ? AND typeof(value) = 'integer' AND "
+                + ALIVE
+                + " RETURNING value",
+                (delta, now, key, now),
+            ).fetchone()
+            if row is None:
+                row = connection.execute(
+                    'SELECT value FROM cache WHERE key = ? AND ' + ALIVE,
+                    (key, now),
+                ).fetchone()
+                if row is None:
+                    raise ValueError("Key '%s' not found" % key)
+                value = self._decode(row[0]) + delta
+                encoded = self._encode(value)
+                connection.execute(
+                    'UPDATE cache SET value = ?, size = ?, accessed = ? '
+                    'WHERE key = ?',
+                    (encoded, self._size(encoded), now, key),
+                )
+                row = (value,)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return row[0]
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return bool(self._write('DELETE FROM cache WHERE key = ?', (key,)))
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version)
+                for key in keys]
+        if keys:
+            self._write(
+                'DELETE FROM cache WHERE key IN (%s)'
+                % ', '.join('?' * len(keys)),
+                keys,
+            )
+
+    def clear(self):
+        self._write('DELETE FROM cache', ())
+
+    def close(self, **kwargs):
+        # Соединение живёт всё время работы потока: открывать файл
+        # и читать схему на каждый запрос дороже, чем держать его.
+        pass
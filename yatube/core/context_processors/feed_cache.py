@@ -0,0 +1,11 @@
+from django.utils.functional import SimpleLazyObject
+
+from core.cache import feed_timeout, get_generation
+
+
+def feed_cache(request):
+    """Добавляет TTL и текущее поколение для кэша фрагментов лент."""
+    return {
+        'feed_cache_timeout': feed_timeout(),
+        'feed_version': SimpleLazyObject(get_generation),
+    }
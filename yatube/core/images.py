@@ -0,0 +1,94 @@
+"""Приём загруженных картинок: уменьшение, перекодирование, без EXIF.
+
+Телефонные фото по 20 МБ не хранятся как есть: картинка уменьшается до
+IMAGE_MAX_DIMENSION по большей стороне и перекодируется в первый формат
+из IMAGE_FORMATS, который поддерживает собранный Pillow (WebP, AVIF).
+Метаданные при этом не переносятся — кроме ориентации, которая сразу
+применяется к пикселям. JPEG декодируется сразу в уменьшенном масштабе
+(Image.draft), поэтому полноразмерный оригинал в память не попадает.
+
+GIF и анимации сохраняются как есть: перекодирование потеряло бы кадры.
+"""
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+PASSTHROUGH_FORMATS = {'GIF'}
+
+# Форматы без прозрачности: картинке с альфа-каналом нужен PNG.
+OPAQUE_FORMATS = {'JPEG'}
+
+# Форматы, которых может не быть в сборке Pillow, и их имена в features.
+# Старые версии не знают avif вовсе, поэтому проверка — по списку
+# get_supported(), а не check(), который на незнакомое имя предупреждает.
+FEATURES = {'WEBP': 'webp', 'AVIF': 'avif', 'JPEG': 'jpg'}
+
+# Image.Resampling появился в Pillow 9.1; в requirements.txt — 8.3.
+LANCZOS = getattr(Image, 'Resampling', Image).LANCZOS
+
+EXTENSIONS = {'WEBP': 'webp', 'AVIF': 'avif', 'JPEG': 'jpg', 'PNG': 'png'}
+
+
+def output_format(has_alpha):
+    """Первый поддерживаемый Pillow формат из IMAGE_FORMATS."""
+    supported = features.get_supported()
+    for name in settings.IMAGE_FORMATS:
+        if name in FEATURES and FEATURES[name] not in supported:
+            continue
+        if has_alpha and name in OPAQUE_FORMATS:
+            return 'PNG'
+        return name
+    return 'PNG' if has_alpha else 'JPEG'
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def _rename(name, image_format):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return f'{stem}.{EXTENSIONS[image_format]}'
+
+
+def ingest(upload):
+    """Обработанная картинка: (файл, ширина, высота).
+
+    Файл — исходный, если перекодировать нечего или результат вышел
+    бы больше исходника.
+    """
+    upload.seek(0)
+    image = Image.open(upload)
+    limit = settings.IMAGE_MAX_DIMENSION
+    if (
+        image.format in PASSTHROUGH_FORMATS
+        or getattr(image, 'is_animated', False)
+    ):
+        upload.seek(0)
+        return upload, image.width, image.height
+    has_metadata = bool(image.info.get('exif') or image.getexif())
+    image.draft('RGB', (limit, limit))
+    image = ImageOps.exif_transpose(image)
+    resized = max(image.size) > limit
+    image.thumbnail((limit, limit), LANCZOS)
+    has_alpha = _has_alpha(image)
+    image_format = output_format(has_alpha)
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+    buffer = io.BytesIO()
+    image.save(
+        buffer,
+        image_format,
+        quality=settings.IMAGE_QUALITY,
+        optimize=True,
+    )
+    if not (resized or has_metadata) and buffer.tell() >= upload.size:
+        upload.seek(0)
+        return upload, image.width, image.height
+    content = ContentFile(
+        buffer.getvalue(), name=_rename(upload.name, image_format)
+    )
+    return content, image.width, image.height
@@ -0,0 +1,94 @@
+"""Отправка писем через очередь задач.
+
+QueuedEmailBackend только ставит письмо в очередь, а отправляет его
+воркер бэкендом из settings.QUEUED_EMAIL_BACKEND — запрос не ждёт ни
+SMTP, ни записи файла. В задаче хранятся поля письма в JSON, а не
+сам объект: из таблицы задач не исполняется код, и письмо не зависит
+от внутреннего устройства EmailMessage в разных версиях Django.
+"""
+import base64
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .tasks import task
+
+
+def _dump_content(content):
+    if isinstance(content, bytes):
+        return {'base64': base64.b64encode(content).decode()}
+    return {'text': content}
+
+
+def _load_content(data):
+    if 'base64' in data:
+        return base64.b64decode(data['base64'])
+    return data['text']
+
+
+def dump(message):
+    """Поля письма для JSON."""
+    attachments = []
+    for attachment in message.attachments:
+        if not isinstance(attachment, tuple):
+            raise ValueError('Вложения MIMEBase в очередь не ставятся.')
+        filename, content, mimetype = attachment
+        attachments.append({
+            'filename': filename,
+            'content': _dump_content(content),
+            'mimetype': mimetype,
+        })
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'content_subtype': message.content_subtype,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': [
+            [content, mimetype]
+            for content, mimetype in getattr(message, 'alternatives', [])
+        ],
+        'attachments': attachments,
+    }
+
+
+def load(data):
+    """Письмо из полей, сохранённых dump()."""
+    message = EmailMultiAlternatives(
+        subject=data['subject'],
+        body=data['body'],
+        from_email=data['from_email'],
+        to=data['to'],
+        cc=data['cc'],
+        bcc=data['bcc'],
+        reply_to=data['reply_to'],
+        headers=data['headers'],
+    )
+    message.content_subtype = data['content_subtype']
+    for content, mimetype in data['alternatives']:
+        message.attach_alternative(content, mimetype)
+    for attachment in data['attachments']:
+        message.attach(
+            attachment['filename'],
+            _load_content(attachment['content']),
+            attachment['mimetype'],
+        )
+    return message
+
+
+@task
+def send(data):
+    connection = get_connection(settings.QUEUED_EMAIL_BACKEND)
+    connection.send_messages([load(data)])
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            send.enqueue(dump(message))
+        return len(email_messages)
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from core.bench import percentile, wsgi_environ
+
+
+def split_path(url):
+    path, _, query = url.partition('?')
+    return path, query
+
+
+def wsgi_request(handler, url, delay):
+    statuses = []
+    start = time.perf_counter()
+    body = handler(
+        wsgi_environ(url), lambda status, headers: statuses.append(status)
+    )
+    for _ in body:
+        # Медленный клиент: поток воркера ждёт, пока ответ уйдёт в сокет.
+        time.sleep(delay)
+    body.close()
+    return statuses[0], time.perf_counter() - start
+
+
+async def asgi_request(handler, url, delay):
+    path, query = split_path(url)
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'query_string': query.encode(),
+        'headers': [(b'host', b'localhost')],
+        'server': ('localhost', 80),
+    }
+    statuses = []
+    requested = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+        elif not message.get('more_body'):
+            # Медленный клиент: ждёт корутина, а не поток.
+            await asyncio.sleep(delay)
+            finished.set()
+
+    start = time.perf_counter()
+    await handler(scope, receive, send)
+    return f'{statuses[0]}', time.perf_counter() - start
+
+
+def run_wsgi(url, requests, concurrency, delay):
+    handler = WSGIHandler()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        results = list(executor.map(
+            lambda _: wsgi_request(handler, url, delay), range(requests)
+        ))
+    return results, time.perf_counter() - start
+
+
+def run_asgi(url, requests, concurrency, delay):
+    handler = ASGIHandler()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            return await asgi_request(handler, url, delay)
+
+    async def main():
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one() for _ in range(requests)))
+        return results, time.perf_counter() - start
+
+    return asyncio.run(main())
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность WSGI с синхронными '
+        'представлениями и ASGI с асинхронными при медленных клиентах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='/')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument(
+            '--clients', type=int, default=50,
+            help='Одновременных клиентов.',
+        )
+        parser.add_argument(
+            '--threads', type=int, default=8,
+            help='Потоков WSGI-сервера (gunicorn --threads).',
+        )
+        parser.add_argument(
+            '--client-delay', type=float, default=50,
+            help='Сколько миллисекунд клиент принимает ответ.',
+        )
+        parser.add_argument(
+            '--mode', choices=('wsgi', 'asgi'),
+            help='Запустить один режим в текущем процессе.',
+        )
+
+    def handle(self, *args, **options):
+        if options['mode']:
+            return self.run_mode(options)
+        # Представления выбираются при импорте URLconf, поэтому каждый
+        # режим запускается в отдельном процессе со своим окружением.
+        self.stdout.write(
+            f'{"режим":<6} {"запр/с":>8} {"p50":>9} {"p99":>9} {"ошибки":>7}'
+        )
+        for mode, async_views in (('wsgi', '0'), ('asgi', '1')):
+            env = dict(os.environ, YATUBE_ASYNC_VIEWS=async_views)
+            output = subprocess.run(
+                [
+                    sys.executable, sys.argv[0], 'bench_asgi',
+                    '--mode', mode,
+                    '--url', options['url'],
+                    '--requests', str(options['requests']),
+                    '--clients', str(options['clients']),
+                    '--threads', str(options['threads']),
+                    '--client-delay', str(options['client_delay']),
+                ],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            self.stdout.write(
+                f'{mode:<6} {result["rps"]:>8.1f} '
+                f'{result["p50"]:>7.1f}мс {result["p99"]:>7.1f}мс '
+                f'{result["errors"]:>7}'
+            )
+
+    def run_mode(self, options):
+        # В DEBUG включены журнал SQL-запросов и debug_toolbar, который
+        # на каждый запрос резолвит имя хоста Docker — замеры не про то.
+        with override_settings(DEBUG=False):
+            results, elapsed = self.serve(options)
+        latencies = [latency * 1000 for _, latency in results]
+        self.stdout.write(json.dumps({
+            'rps': len(results) / elapsed,
+            'p50': statistics.median(latencies),
+            'p99': percentile(latencies, 0.99),
+            'errors': sum(
+                not status.startswith('200') for status, _ in results
+            ),
+        }))
+
+    def serve(self, options):
+        delay = options['client_delay'] / 1000
+        args = (options['url'], options['requests'])
+        if options['mode'] == 'wsgi':
+            return run_wsgi(*args, options['threads'], delay)
+        if not settings.ASYNC_VIEWS:
+            self.stderr.write('ASYNC_VIEWS выключены: ASGI с sync views.')
+        return run_asgi(*args, options['clients'], delay)
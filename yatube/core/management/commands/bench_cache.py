@@ -0,0 +1,77 @@
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.bench import percentile
+from core.cache_backends import SQLiteCache
+
+
+def timed(operation, keys):
+    result = []
+    for key in keys:
+        start = time.perf_counter_ns()
+        operation(key)
+        result.append((time.perf_counter_ns() - start) / 1000)
+    return result
+
+
+def write_from_child(cache, keys):
+    for key in keys:
+        cache.set(f'child-{key}', 1)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает задержку попаданий LocMemCache, FileBasedCache '
+        'и SQLiteCache и проверяет, видят ли другие процессы данные.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keys', type=int, default=1000)
+        parser.add_argument('--reads', type=int, default=10000)
+        parser.add_argument('--value-size', type=int, default=1024)
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp()
+        params = {'OPTIONS': {'MAX_ENTRIES': options['keys'] * 3}}
+        backends = {
+            'locmem': LocMemCache('bench', params),
+            'file': FileBasedCache(os.path.join(directory, 'file'), params),
+            'sqlite': SQLiteCache(
+                os.path.join(directory, 'cache.sqlite3'), params
+            ),
+        }
+        keys = [f'key-{i}' for i in range(options['keys'])]
+        value = 'x' * options['value_size']
+        reads = random.choices(keys, k=options['reads'])
+        self.stdout.write(
+            f'{"бэкенд":<8} {"set p50":>9} {"get p50":>9} {"get p99":>9} '
+            f'{"incr p50":>9} {"другой процесс":>15}'
+        )
+        for name, cache in backends.items():
+            cache.clear()
+            sets = timed(lambda key: cache.set(key, value), keys)
+            gets = timed(cache.get, reads)
+            cache.set('counter', 0)
+            incrs = timed(lambda key: cache.incr('counter'), keys)
+            # Записи дочернего процесса видны родителю только в общем кэше.
+            process = multiprocessing.get_context('fork').Process(
+                target=write_from_child, args=(cache, keys)
+            )
+            process.start()
+            process.join()
+            hits = len(cache.get_many([f'child-{key}' for key in keys]))
+            self.stdout.write(
+                f'{name:<8} {statistics.median(sets):>7.1f}мкс '
+                f'{statistics.median(gets):>7.1f}мкс '
+                f'{percentile(gets, 0.99):>7.1f}мкс '
+                f'{statistics.median(incrs):>7.1f}мкс '
+                f'{hits * 100 // len(keys):>14}%'
+            )
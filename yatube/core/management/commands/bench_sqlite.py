@@ -0,0 +1,186 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core import sqlite
+from core.bench import percentile
+
+READ_SQL = (
+    'SELECT p.id, p.text, p.pub_date, u.username FROM posts_post p '
+    'JOIN auth_user u ON u.id = p.author_id '
+    'ORDER BY p.pub_date DESC, p.id DESC LIMIT 10 OFFSET ?'
+)
+
+# Как add_comment: сначала чтение поста, потом запись.
+WRITE_SQL = (
+    ('SELECT id FROM posts_post WHERE id = ?', 'post'),
+    (
+        'INSERT INTO posts_comment (post_id, author_id, text, created) '
+        "VALUES (?, ?, 'bench', datetime('now'))",
+        'post_author',
+    ),
+    (
+        'UPDATE posts_post SET comments_count = comments_count + 1 '
+        'WHERE id = ?',
+        'post',
+    ),
+)
+
+# До: умолчания SQLite, соединение на каждый запрос и отложенные
+# транзакции. После: профиль SQLITE_PROFILE, постоянное соединение и
+# BEGIN IMMEDIATE.
+MODES = {
+    'до': {'profile': 'default', 'persistent': False, 'begin': 'BEGIN'},
+    'после': {
+        'profile': None, 'persistent': True, 'begin': 'BEGIN IMMEDIATE',
+    },
+}
+
+
+def connect(path, pragmas):
+    conn = sqlite3.connect(path, isolation_level=None)
+    for name, value in pragmas.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
+
+def read(conn, rng, ids):
+    conn.execute(READ_SQL, (rng.randrange(100) * 10,)).fetchall()
+
+
+def write(conn, rng, ids, begin):
+    post_id = rng.choice(ids['posts'])
+    params = {'post': (post_id,), 'post_author': (
+        post_id, rng.choice(ids['users'])
+    )}
+    conn.execute(begin)
+    try:
+        for sql, args in WRITE_SQL:
+            conn.execute(sql, params[args]).fetchall()
+        conn.execute('COMMIT')
+    except sqlite3.Error:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def client(path, mode, pragmas, kind, ids, seconds, seed, results):
+    rng = random.Random(seed)
+    persistent = connect(path, pragmas) if mode['persistent'] else None
+    latencies, errors = [], 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        conn = persistent or connect(path, {})
+        try:
+            if kind == 'read':
+                read(conn, rng, ids)
+            else:
+                write(conn, rng, ids, mode['begin'])
+        except sqlite3.OperationalError:
+            # «database is locked»: при отложенной транзакции ожидание
+            # не помогает, и запрос падает сразу.
+            errors += 1
+        else:
+            latencies.append(time.perf_counter() - start)
+        finally:
+            if persistent is None:
+                conn.close()
+    results.put((kind, latencies, errors))
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность чтений и записей SQLite '
+        'при одновременной нагрузке до и после настройки соединений '
+        '(core.sqlite) на копии базы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5)
+
+    def copy_database(self, directory):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда сравнивает настройки SQLite.')
+        path = os.path.join(directory, 'bench.sqlite3')
+        source = sqlite3.connect(settings.DATABASES['default']['NAME'])
+        target = sqlite3.connect(path)
+        source.backup(target)
+        source.close()
+        ids = {
+            'posts': [row[0] for row in target.execute(
+                'SELECT id FROM posts_post ORDER BY random() LIMIT 1000'
+            )],
+            'users': [row[0] for row in target.execute(
+                'SELECT id FROM auth_user ORDER BY random() LIMIT 1000'
+            )],
+        }
+        target.close()
+        if not ids['posts']:
+            raise CommandError(
+                'В базе нет постов: сначала запустите seed_data.'
+            )
+        return path, ids
+
+    def run(self, path, ids, mode, options):
+        pragmas = sqlite.pragmas(mode['profile'])
+        # journal_mode хранится в файле: переключаем до старта клиентов.
+        connect(path, pragmas).close()
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        kinds = (
+            ['read'] * options['readers'] + ['write'] * options['writers']
+        )
+        processes = [
+            context.Process(target=client, args=(
+                path, mode, pragmas, kind, ids, options['seconds'],
+                number, results,
+            ))
+            for number, kind in enumerate(kinds)
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        stats = {}
+        for kind in ('read', 'write'):
+            latencies = [
+                value for name, values, _ in collected if name == kind
+                for value in values
+            ]
+            stats[kind] = {
+                'rate': len(latencies) / options['seconds'],
+                'p99': percentile(latencies, 0.99) * 1000
+                if latencies else 0,
+                'errors': sum(
+                    errors for name, _, errors in collected if name == kind
+                ),
+            }
+        return stats
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            path, ids = self.copy_database(directory)
+            connection.close()
+            self.stdout.write(
+                f'{"режим":<6} {"чтений/с":>9} {"p99 чт.":>9} '
+                f'{"записей/с":>10} {"p99 зап.":>9} {"ошибок":>7}'
+            )
+            for name, mode in MODES.items():
+                stats = self.run(path, ids, mode, options)
+                reads, writes = stats['read'], stats['write']
+                self.stdout.write(
+                    f'{name:<6} {reads["rate"]:>9.0f} '
+                    f'{reads["p99"]:>7.1f}мс '
+                    f'{writes["rate"]:>10.0f} {writes["p99"]:>7.1f}мс '
+                    f'{reads["errors"] + writes["errors"]:>7}'
+                )
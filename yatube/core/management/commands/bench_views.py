@@ -0,0 +1,217 @@
+import json
+import random
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY
+from django.contrib.auth import SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from core.bench import percentile, wsgi_environ
+from posts.models import Follow, Group, Post, User
+
+# Сколько запросов каждого вида прогоняется под tracemalloc: он
+# замедляет интерпретатор в разы, поэтому задержки меряются отдельно.
+MEMORY_REQUESTS = 10
+
+METRICS = ('p50', 'p95', 'p99', 'queries', 'peak_kb')
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def login_cookies(user):
+    """Сессия вошедшего пользователя и CSRF-cookie для POST-запросов."""
+    session = SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    return {
+        settings.SESSION_COOKIE_NAME: session.session_key,
+        settings.CSRF_COOKIE_NAME: get_random_string(32),
+    }
+
+
+def scenarios(reader, cookies, rng):
+    """Виды запросов: функции, возвращающие (метод, url, данные, cookies)."""
+    post_ids = list(
+        Post.objects.order_by('-pub_date').values_list('pk', flat=True)[:1000]
+    )
+    if not post_ids:
+        raise CommandError('В базе нет постов: сначала запустите seed_data.')
+    authors = list(
+        Post.objects.filter(pk__in=post_ids)
+        .values_list('author__username', flat=True).distinct()
+    )
+    slugs = list(Group.objects.values_list('slug', flat=True)[:1000])
+    scenarios = {
+        'index': lambda: ('GET', reverse('posts:index'), None, None),
+        'group_posts': lambda: (
+            'GET', reverse('posts:group_list', args=[rng.choice(slugs)]),
+            None, None,
+        ),
+        'profile': lambda: (
+            'GET', reverse('posts:profile', args=[rng.choice(authors)]),
+            None, None,
+        ),
+        'post_detail': lambda: (
+            'GET', reverse('posts:post_detail', args=[rng.choice(post_ids)]),
+            None, None,
+        ),
+        'follow_index': lambda: (
+            'GET', reverse('posts:follow_index'), None, cookies,
+        ),
+        # Последним: новый комментарий сбрасывает кэш лент.
+        'add_comment': lambda: (
+            'POST', reverse('posts:add_comment', args=[rng.choice(post_ids)]),
+            {
+                'text': f'Комментарий {reader.username}',
+                'csrfmiddlewaretoken': cookies[settings.CSRF_COOKIE_NAME],
+            },
+            cookies,
+        ),
+    }
+    if not slugs:
+        del scenarios['group_posts']
+    return scenarios
+
+
+def request(handler, method, url, data, cookies):
+    statuses = []
+    body = handler(
+        wsgi_environ(url, method, data, cookies),
+        lambda status, headers: statuses.append(status),
+    )
+    b''.join(body)
+    body.close()
+    return int(statuses[0].split()[0])
+
+
+def delta(before, after):
+    if not before:
+        return '—'
+    return f'{(after - before) * 100 / before:+.0f}%'
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет основные страницы через WSGI-обработчик и печатает '
+        'перцентили задержки, число SQL-запросов и пик памяти. '
+        'add_comment пишет в базу: запускайте на копии с seed_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output', help='Сохранить результаты в JSON.'
+        )
+        parser.add_argument(
+            '--compare', help='JSON прошлого запуска для сравнения.'
+        )
+
+    def handle(self, *args, **options):
+        # Журнал SQL в DEBUG и debug_toolbar искажают замеры.
+        with override_settings(DEBUG=False):
+            self.bench(options)
+
+    def bench(self, options):
+        rng = random.Random(options['seed'])
+        reader = User.objects.filter(
+            pk=Follow.objects.order_by('user_id')
+            .values_list('user_id', flat=True)[:1]
+        ).first()
+        if reader is None:
+            raise CommandError('В базе нет подписок: запустите seed_data.')
+        handler = WSGIHandler()
+        results = {}
+        for name, make in scenarios(
+            reader, login_cookies(reader), rng
+        ).items():
+            results[name] = self.measure(handler, make, options)
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as file:
+                baseline = json.load(file)['views']
+        self.report(results, baseline)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({
+                    'requests': options['requests'],
+                    'cold': options['cold'],
+                    'posts': Post.objects.count(),
+                    'views': results,
+                }, file, indent=2)
+
+    def measure(self, handler, make, options):
+        counter = QueryCounter()
+        latencies, queries, errors = [], [], 0
+        if not options['cold']:
+            request(handler, *make())
+        with connection.execute_wrapper(counter):
+            for _ in range(options['requests']):
+                if options['cold']:
+                    cache.clear()
+                counter.count = 0
+                start = time.perf_counter()
+                status = request(handler, *make())
+                latencies.append((time.perf_counter() - start) * 1000)
+                queries.append(counter.count)
+                errors += status >= 400
+        peak = 0
+        tracemalloc.start()
+        try:
+            for _ in range(MEMORY_REQUESTS):
+                if options['cold']:
+                    cache.clear()
+                tracemalloc.reset_peak()
+                request(handler, *make())
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+        return {
+            'p50': percentile(latencies, 0.5),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+            'queries': sum(queries) / len(queries),
+            'peak_kb': peak / 1024,
+            'errors': errors,
+        }
+
+    def report(self, results, baseline):
+        self.stdout.write(
+            f'{"представление":<14} {"p50":>9} {"p95":>9} {"p99":>9} '
+            f'{"запросы":>8} {"пик":>9} {"ошибки":>7}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<14} {result["p50"]:>7.1f}мс '
+                f'{result["p95"]:>7.1f}мс {result["p99"]:>7.1f}мс '
+                f'{result["queries"]:>8.1f} {result["peak_kb"]:>7.0f}КБ '
+                f'{result["errors"]:>7}'
+            )
+            if baseline and name in baseline:
+                deltas = ' '.join(
+                    f'{metric} {delta(baseline[name][metric], result[metric])}'
+                    for metric in METRICS
+                )
+                self.stdout.write(f'{"":<14} {deltas}')
@@ -0,0 +1,60 @@
+import multiprocessing
+import signal
+import threading
+
+import django
+from django.db import connections
+from django.core.management.base import BaseCommand
+
+from core import tasks
+
+
+def worker(once):
+    # С методом spawn дочерний процесс начинает с чистого интерпретатора.
+    django.setup()
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        # Текущая задача доделывается, новые не забираются.
+        signal.signal(signum, lambda *args: stop.set())
+    tasks.work(once=once, stop=stop)
+
+
+class Command(BaseCommand):
+    help = 'Выполняет задачи очереди core.tasks в пуле процессов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить готовые задачи и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        if concurrency <= 1:
+            worker(options['once'])
+            return
+        # Открытые соединения нельзя делить с дочерними процессами.
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(
+                target=worker, args=(options['once'],), daemon=True
+            )
+            for _ in range(concurrency)
+        ]
+        for process in processes:
+            process.start()
+
+        def stop(*args):
+            for process in processes:
+                process.terminate()
+
+        signal.signal(signal.SIGTERM, stop)
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            # SIGINT от терминала уже получили и дочерние процессы.
+            for process in processes:
+                process.join()
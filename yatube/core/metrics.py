@@ -0,0 +1,343 @@
+"""Метрики производительности запросов в текстовом формате Prometheus.
+
+Для каждого запроса MetricsMiddleware считает число и длительность по
+имени URL (posts:index, posts:profile, ...). У доли запросов
+METRICS_SAMPLE_RATE дополнительно замеряются число и время SQL-запросов,
+время рендеринга шаблонов и попадания в кэш: эти замеры требуют обёрток
+вокруг курсора, шаблона и кэша, и выборка держит их цену в пределах
+погрешности.
+
+Счётчики живут в памяти процесса. Если задан METRICS_DIR, процесс не
+чаще раза в METRICS_FLUSH_INTERVAL секунд целиком записывает их в файл
+<pid>.json этого каталога, а /metrics складывает файлы всех процессов.
+Без METRICS_DIR каждый процесс показывает только себя.
+"""
+import bisect
+import glob
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import Template
+from django.urls import URLResolver, get_resolver
+from django.utils.module_loading import import_string
+
+PREFIX = 'yatube_'
+
+UNKNOWN_VIEW = 'unknown'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+# Имя: (описание, границы корзин, множитель для суммы). Суммы хранятся
+# целыми числами, поэтому секунды — в микросекундах.
+HISTOGRAMS = {
+    'request_duration_seconds': (
+        'Длительность обработки запроса.', LATENCY_BUCKETS, 10 ** 6,
+    ),
+    'db_queries': (
+        'SQL-запросов на запрос (по выборке).', QUERY_BUCKETS, 1,
+    ),
+    'db_duration_seconds': (
+        'Время SQL-запросов на запрос (по выборке).',
+        LATENCY_BUCKETS, 10 ** 6,
+    ),
+    'template_duration_seconds': (
+        'Время рендеринга шаблонов на запрос (по выборке).',
+        LATENCY_BUCKETS, 10 ** 6,
+    ),
+}
+
+COUNTERS = {
+    'requests_total': 'Обработано запросов.',
+    'sampled_requests_total': 'Запросов, попавших в выборку.',
+    'cache_hits_total': 'Попаданий в кэш (по выборке).',
+    'cache_misses_total': 'Промахов кэша (по выборке).',
+}
+
+_MISSING = object()
+
+_current = ContextVar('metrics_sample', default=None)
+
+
+class Sample:
+    """Замеры одного запроса из выборки."""
+
+    __slots__ = (
+        'queries', 'db_time', 'template_time', 'rendering',
+        'cache_hits', 'cache_misses',
+    )
+
+    def __init__(self):
+        self.queries = self.cache_hits = self.cache_misses = 0
+        self.db_time = self.template_time = 0.0
+        self.rendering = False
+
+
+def _key(view, name, part):
+    return f'{view}:{name}:{part}'
+
+
+class Registry:
+    """Счётчики процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = defaultdict(int)
+        self.flushed = time.monotonic()
+
+    def inc(self, view, name, value=1):
+        with self.lock:
+            self.values[_key(view, name, 'total')] += value
+
+    def observe(self, view, name, value):
+        _, buckets, scale = HISTOGRAMS[name]
+        bucket = bisect.bisect_left(buckets, value)
+        with self.lock:
+            self.values[_key(view, name, bucket)] += 1
+            self.values[_key(view, name, 'count')] += 1
+            self.values[_key(view, name, 'sum')] += round(value * scale)
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.values)
+
+    def flush(self, force=False):
+        """Записывает счётчики в METRICS_DIR, если он задан."""
+        directory = settings.METRICS_DIR
+        if not directory:
+            return
+        now = time.monotonic()
+        with self.lock:
+            interval = settings.METRICS_FLUSH_INTERVAL
+            if not force and now - self.flushed < interval:
+                return
+            self.flushed = now
+            # Под блокировкой: все потоки процесса пишут один файл.
+            _write(directory, self.values)
+
+
+def _write(directory, values):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{os.getpid()}.json')
+    with open(f'{path}.tmp', 'w') as file:
+        json.dump(values, file)
+    # Читатель видит либо старый файл, либо новый, но не половину.
+    os.replace(f'{path}.tmp', path)
+
+
+registry = Registry()
+
+
+def collect():
+    """Счётчики всех процессов из METRICS_DIR или только этого процесса.
+
+    Файлы завершившихся процессов остаются, и счётчики не убывают.
+    Процесс, получивший тот же pid, перезапишет файл — для Prometheus
+    это сброс счётчика.
+    """
+    directory = settings.METRICS_DIR
+    if not directory:
+        return registry.snapshot()
+    registry.flush(force=True)
+    totals = defaultdict(int)
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        try:
+            with open(path) as file:
+                values = json.load(file)
+        except (OSError, ValueError):
+            continue
+        for key, value in values.items():
+            totals[key] += value
+    return totals
+
+
+def record_query(execute, sql, params, many, context):
+    sample = _current.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.queries += 1
+        sample.db_time += time.perf_counter() - start
+
+
+def _add_query_wrapper(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def _timed_render(render):
+    @wraps(render)
+    def inner(self, context=None, request=None):
+        sample = _current.get()
+        if sample is None or sample.rendering:
+            # Вложенный render_to_string уже учтён во внешнем.
+            return render(self, context, request)
+        sample.rendering = True
+        start = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            sample.template_time += time.perf_counter() - start
+            sample.rendering = False
+    inner.metrics_wrapped = True
+    return inner
+
+
+def _counted_get(get):
+    @wraps(get)
+    def inner(self, key, default=None, version=None):
+        value = get(self, key, _MISSING, version)
+        sample = _current.get()
+        if sample is not None:
+            if value is _MISSING:
+                sample.cache_misses += 1
+            else:
+                sample.cache_hits += 1
+        return default if value is _MISSING else value
+    inner.metrics_wrapped = True
+    return inner
+
+
+def _counted_get_many(get_many):
+    @wraps(get_many)
+    def inner(self, keys, version=None):
+        keys = list(keys)
+        found = get_many(self, keys, version)
+        sample = _current.get()
+        if sample is not None:
+            sample.cache_hits += len(found)
+            sample.cache_misses += len(keys) - len(found)
+        return found
+    inner.metrics_wrapped = True
+    return inner
+
+
+def _wrap(cls, name, wrapper):
+    method = getattr(cls, name)
+    if not getattr(method, 'metrics_wrapped', False):
+        setattr(cls, name, wrapper(method))
+
+
+_installed = False
+
+
+def install():
+    """Подключает обёртки SQL, шаблонов и кэша; повторный вызов — no-op.
+
+    Обёртки ничего не делают, пока текущий запрос не попал в выборку.
+    """
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    connection_created.connect(_add_query_wrapper)
+    # Уже открытые соединения сигнала не пришлют.
+    for connection in connections.all(initialized_only=True):
+        _add_query_wrapper(connection)
+    _wrap(Template, 'render', _timed_render)
+    for params in settings.CACHES.values():
+        backend = import_string(params['BACKEND'])
+        _wrap(backend, 'get', _counted_get)
+        _wrap(backend, 'get_many', _counted_get_many)
+
+
+def start_request():
+    """Начинает замер; возвращает выборку (или None) и токен контекста."""
+    if random.random() >= settings.METRICS_SAMPLE_RATE:
+        return None, None
+    sample = Sample()
+    return sample, _current.set(sample)
+
+
+def finish_request(request, duration, sample, token):
+    match = request.resolver_match
+    view = match.view_name if match and match.url_name else UNKNOWN_VIEW
+    registry.inc(view, 'requests_total')
+    registry.observe(view, 'request_duration_seconds', duration)
+    if sample is not None:
+        _current.reset(token)
+        registry.inc(view, 'sampled_requests_total')
+        registry.inc(view, 'cache_hits_total', sample.cache_hits)
+        registry.inc(view, 'cache_misses_total', sample.cache_misses)
+        registry.observe(view, 'db_queries', sample.queries)
+        registry.observe(view, 'db_duration_seconds', sample.db_time)
+        registry.observe(
+            view, 'template_duration_seconds', sample.template_time
+        )
+    registry.flush()
+
+
+def _patterns_names(patterns, namespace=''):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            prefix = namespace
+            if pattern.namespace:
+                prefix = f'{namespace}{pattern.namespace}:'
+            yield from _patterns_names(pattern.url_patterns, prefix)
+        elif pattern.name:
+            yield f'{namespace}{pattern.name}'
+
+
+def view_names():
+    """Все именованные URL проекта: по ним ищутся счётчики."""
+    names = dict.fromkeys(_patterns_names(get_resolver().url_patterns))
+    return [*names, UNKNOWN_VIEW]
+
+
+def _number(value):
+    return f'{value:.6f}'.rstrip('0').rstrip('.')
+
+
+def export():
+    """Все метрики в текстовом формате Prometheus."""
+    values = collect()
+    views = [
+        view for view in view_names()
+        if _key(view, 'requests_total', 'total') in values
+    ]
+    lines = []
+    for name, description in COUNTERS.items():
+        lines += [
+            f'# HELP {PREFIX}{name} {description}',
+            f'# TYPE {PREFIX}{name} counter',
+        ]
+        lines += [
+            f'{PREFIX}{name}{{view="{view}"}} '
+            f'{values.get(_key(view, name, "total"), 0)}'
+            for view in views
+        ]
+    for name, (description, buckets, scale) in HISTOGRAMS.items():
+        lines += [
+            f'# HELP {PREFIX}{name} {description}',
+            f'# TYPE {PREFIX}{name} histogram',
+        ]
+        for view in views:
+            cumulative = 0
+            for bucket, bound in enumerate((*buckets, '+Inf')):
+                cumulative += values.get(_key(view, name, bucket), 0)
+                if bound != '+Inf':
+                    bound = _number(bound)
+                lines.append(
+                    f'{PREFIX}{name}_bucket{{view="{view}",le="{bound}"}} '
+                    f'{cumulative}'
+                )
+            total = values.get(_key(view, name, 'sum'), 0) / scale
+            lines += [
+                f'{PREFIX}{name}_sum{{view="{view}"}} {_number(total)}',
+                f'{PREFIX}{name}_count{{view="{view}"}} '
+                f'{values.get(_key(view, name, "count"), 0)}',
+            ]
+    return '\n'.join(lines) + '\n'
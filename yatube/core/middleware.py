@@ -0,0 +1,75 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from . import metrics, slow_queries
+
+
+class Middleware:
+    """Основа middleware, работающих и под WSGI, и под ASGI.
+
+    Наследники переопределяют before() и after(); значение before()
+    передаётся в after() после ответа представления.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def before(self, request):
+        return None
+
+    def after(self, request, state):
+        pass
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state = self.before(request)
+        try:
+            return self.get_response(request)
+        finally:
+            self.after(request, state)
+
+    async def __acall__(self, request):
+        state = self.before(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            self.after(request, state)
+
+
+class MetricsMiddleware(Middleware):
+    """Собирает метрики запросов для /metrics (см. core.metrics)."""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        metrics.install()
+
+    def before(self, request):
+        return (*metrics.start_request(), time.perf_counter())
+
+    def after(self, request, state):
+        sample, token, start = state
+        metrics.finish_request(
+            request, time.perf_counter() - start, sample, token
+        )
+
+
+class SlowQueryLogMiddleware(Middleware):
+    """Связывает медленные запросы с представлением (core.slow_queries)."""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        slow_queries.install()
+
+    def before(self, request):
+        return slow_queries.start_request(request)
+
+    def after(self, request, state):
+        slow_queries.finish_request(state)
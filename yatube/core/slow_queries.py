@@ -0,0 +1,167 @@
+"""Журнал медленных SQL-запросов.
+
+Обёртка execute_wrapper на каждом соединении замеряет запросы; те, что
+выполнялись дольше SLOW_QUERY_THRESHOLD миллисекунд, пишутся в логгер
+yatube.slow_queries одной JSON-строкой: текст и параметры запроса,
+представление, место вызова в коде проекта и план EXPLAIN. Записей не
+больше SLOW_QUERY_LOG_RATE в минуту на процесс; сколько пропущено,
+видно в поле suppressed следующей записи.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import traceback
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+from . import metrics
+
+logger = logging.getLogger('yatube.slow_queries')
+
+MAX_PARAM_LENGTH = 200
+
+# Кадры обёрток над курсором — не место вызова.
+WRAPPER_FILES = {__file__, metrics.__file__}
+
+_request = ContextVar('slow_query_request', default=None)
+
+_explaining = ContextVar('slow_query_explaining', default=False)
+
+
+class RateLimit:
+    """Не больше SLOW_QUERY_LOG_RATE записей за минуту."""
+
+    window = 60
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.count = 0
+        self.suppressed = 0
+
+    def allow(self):
+        """Можно ли писать запись и сколько до неё пропущено."""
+        with self.lock:
+            now = time.monotonic()
+            if now - self.started >= self.window:
+                self.started, self.count = now, 0
+            if self.count >= settings.SLOW_QUERY_LOG_RATE:
+                self.suppressed += 1
+                return False, 0
+            self.count += 1
+            suppressed, self.suppressed = self.suppressed, 0
+            return True, suppressed
+
+
+rate_limit = RateLimit()
+
+
+def _short(value):
+    text = repr(value)
+    if len(text) > MAX_PARAM_LENGTH:
+        return text[:MAX_PARAM_LENGTH] + '…'
+    return text
+
+
+def _params(params, many):
+    if many or params is None:
+        return None
+    if isinstance(params, dict):
+        return {name: _short(value) for name, value in params.items()}
+    return [_short(value) for value in params]
+
+
+def _call_site():
+    """Ближайший к запросу кадр из кода проекта."""
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if (
+            filename.startswith(settings.BASE_DIR)
+            and filename not in WRAPPER_FILES
+            and 'site-packages' not in filename
+        ):
+            path = os.path.relpath(filename, settings.BASE_DIR)
+            return f'{path}:{frame.lineno} in {frame.name}'
+    return None
+
+
+def _explain(connection, sql, params):
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return None
+    token = _explaining.set(True)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'{connection.ops.explain_query_prefix()} {sql}', params
+            )
+            return [str(row[-1]) for row in cursor.fetchall()]
+    except DatabaseError:
+        return None
+    finally:
+        _explaining.reset(token)
+
+
+def _log(connection, sql, params, many, duration):
+    allowed, suppressed = rate_limit.allow()
+    if not allowed:
+        return
+    request = _request.get()
+    match = request.resolver_match if request is not None else None
+    record = {
+        'time': timezone.now().isoformat(),
+        'duration_ms': round(duration, 3),
+        'database': connection.alias,
+        'sql': sql,
+        'params': _params(params, many),
+        'view': match.view_name if match else None,
+        'path': request.path if request is not None else None,
+        'call_site': _call_site(),
+        'plan': None if many else _explain(connection, sql, params),
+        'suppressed': suppressed,
+    }
+    logger.warning(json.dumps(record, ensure_ascii=False))
+
+
+def log_slow_query(execute, sql, params, many, context):
+    threshold = settings.SLOW_QUERY_THRESHOLD
+    if threshold is None or _explaining.get():
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = (time.perf_counter() - start) * 1000
+        if duration >= threshold:
+            _log(context['connection'], sql, params, many, duration)
+
+
+def _add_query_wrapper(connection, **kwargs):
+    if log_slow_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log_slow_query)
+
+
+_installed = False
+
+
+def install():
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    connection_created.connect(_add_query_wrapper)
+    for connection in connections.all(initialized_only=True):
+        _add_query_wrapper(connection)
+
+
+def start_request(request):
+    return _request.set(request)
+
+
+def finish_request(token):
+    _request.reset(token)
@@ -0,0 +1,43 @@
+"""Настройка соединений SQLite при открытии.
+
+На каждом новом соединении выполняются прагмы профиля
+settings.SQLITE_PROFILE из settings.SQLITE_PROFILES. Профиль по
+умолчанию включает WAL: читатели не ждут писателя, а писатели при
+занятой базе ждут busy_timeout вместо ошибки «database is locked».
+Соединения переиспользуются между запросами (CONN_MAX_AGE), поэтому
+прагмы выполняются не на каждый запрос, а при открытии соединения.
+"""
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+def pragmas(profile=None):
+    """Прагмы профиля: имя -> значение."""
+    return settings.SQLITE_PROFILES[profile or settings.SQLITE_PROFILE]
+
+
+def apply(connection, profile=None):
+    """Выполняет прагмы профиля на sqlite3-соединении."""
+    for name, value in pragmas(profile).items():
+        connection.execute(f'PRAGMA {name} = {value}')
+
+
+def _configure(connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        # Мимо обёрток execute_wrapper: прагмы не запросы приложения.
+        apply(connection.connection)
+
+
+_installed = False
+
+
+def install():
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    connection_created.connect(_configure)
+    for connection in connections.all(initialized_only=True):
+        if connection.connection is not None:
+            _configure(connection)
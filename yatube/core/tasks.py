@@ -0,0 +1,156 @@
+"""Очередь отложенных задач в таблице core_task.
+
+Представления не ждут необязательной работы — превью, писем: функция,
+помеченная @task, ставится в очередь вызовом .enqueue() после фиксации
+транзакции, а выполняет её отдельный процесс manage.py run_worker.
+Брокер не нужен: воркеры забирают задачи из той же базы.
+
+Задачу забирает условный UPDATE, и выигрывает тот воркер, у которого он
+изменил строку. Забранная задача скрыта от остальных на
+TASKS_VISIBILITY_TIMEOUT секунд; если воркер за это время не отчитался
+(упал или завис), её заберёт другой. Упавшая задача повторяется с
+экспоненциальной задержкой, а после TASKS_MAX_ATTEMPTS попыток остаётся
+в таблице со статусом failed и текстом ошибки. Выполненные задачи
+удаляются.
+"""
+import logging
+import random
+import threading
+import traceback
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+def task(func):
+    """Делает функцию задачей: func.enqueue(*args, **kwargs).
+
+    Аргументы сохраняются в JSON. key — ключ против дублей: пока задача
+    с таким ключом не выполнена, повторная постановка ничего не делает;
+    delay — через сколько секунд задачу можно выполнять.
+    """
+    func.task_name = f'{func.__module__}.{func.__qualname__}'
+    func.enqueue = partial(enqueue, func.task_name)
+    return func
+
+
+def enqueue(name, *args, key=None, delay=0, **kwargs):
+    """Ставит задачу в очередь после фиксации текущей транзакции."""
+    transaction.on_commit(
+        lambda: _create(name, args, kwargs, key, delay)
+    )
+
+
+def _create(name, args, kwargs, key, delay):
+    Task.objects.bulk_create(
+        [Task(
+            name=name,
+            args=list(args),
+            kwargs=kwargs,
+            key=key,
+            max_attempts=settings.TASKS_MAX_ATTEMPTS,
+            run_at=timezone.now() + timedelta(seconds=delay),
+        )],
+        ignore_conflicts=True,
+    )
+
+
+def _claimable(now):
+    return (
+        Q(status=Task.QUEUED, run_at__lte=now)
+        | Q(status=Task.RUNNING, locked_until__lt=now)
+    )
+
+
+def claim():
+    """Забирает одну готовую задачу или возвращает None."""
+    now = timezone.now()
+    candidates = Task.objects.filter(_claimable(now)).order_by(
+        'run_at'
+    ).values_list('pk', flat=True)[:settings.TASKS_CLAIM_CANDIDATES]
+    locked_until = now + timedelta(seconds=settings.TASKS_VISIBILITY_TIMEOUT)
+    for pk in candidates:
+        # Строку мог забрать другой воркер между выборкой и UPDATE.
+        claimed = Task.objects.filter(_claimable(now), pk=pk).update(
+            status=Task.RUNNING,
+            locked_until=locked_until,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def retry_delay(attempts):
+    """Задержка перед повтором: растёт вдвое с каждой попыткой."""
+    delay = min(
+        settings.TASKS_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.TASKS_MAX_RETRY_DELAY,
+    )
+    # Разброс, чтобы задачи, упавшие разом, не повторялись разом.
+    return random.uniform(delay / 2, delay)
+
+
+def _fail(task, error):
+    mine = Task.objects.filter(pk=task.pk, attempts=task.attempts)
+    if task.attempts >= task.max_attempts:
+        # Ключ освобождается: задачу можно поставить заново.
+        mine.update(
+            status=Task.FAILED, key=None, locked_until=None,
+            last_error=error,
+        )
+        return
+    mine.update(
+        status=Task.QUEUED,
+        locked_until=None,
+        last_error=error,
+        run_at=timezone.now() + timedelta(
+            seconds=retry_delay(task.attempts)
+        ),
+    )
+
+
+def run(task):
+    """Выполняет забранную задачу; True, если она выполнена."""
+    if task.attempts > task.max_attempts:
+        # Последнюю попытку воркер не довёл до конца.
+        Task.objects.filter(pk=task.pk, attempts=task.attempts).update(
+            status=Task.FAILED, key=None, locked_until=None,
+            last_error='Истёк таймаут видимости',
+        )
+        return False
+    try:
+        func = import_string(task.name)
+        if getattr(func, 'task_name', None) != task.name:
+            raise ValueError(f'{task.name} не помечена @task')
+        func(*task.args, **task.kwargs)
+    except Exception:
+        logger.exception('Задача %s упала', task)
+        _fail(task, traceback.format_exc())
+        return False
+    Task.objects.filter(pk=task.pk, attempts=task.attempts).delete()
+    return True
+
+
+def work(once=False, stop=None):
+    """Выполняет задачи по одной; без once ждёт новые, пока не stop."""
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        # Воркер живёт долго: соединения обновляются, как между запросами.
+        close_old_connections()
+        task = claim()
+        if task is not None:
+            run(task)
+        elif once:
+            return
+        else:
+            stop.wait(settings.TASKS_POLL_INTERVAL)
@@ -0,0 +1,45 @@
+from django import template
+from django.conf import settings
+from django.utils.html import format_html
+
+from core import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(image, variant, css_class='', ready=None):
+    """<img> с srcset из готовых превью варианта и ленивой загрузкой.
+
+    Пока превью нет, выводится заглушка того же размера, а их создание
+    ставится в очередь. ready — уже прочитанный результат
+    get_ready_variant(), например для всей страницы разом.
+    """
+    if not image:
+        return ''
+    params = settings.IMAGE_VARIANTS[variant]
+    if ready is None:
+        ready = thumbnails.get_ready_variant(image, variant)
+    ready, complete = ready
+    if not complete:
+        thumbnails.schedule(image)
+    if not ready:
+        side = params['widths'][0]
+        return format_html(
+            '<div class="{} bg-light" style="width: {}px; height: {}px;">'
+            '</div>',
+            css_class, side, side,
+        )
+    # Ширина и высота задают пропорции, чтобы страница не прыгала
+    # при загрузке картинки.
+    shown = ready[0] if params['crop'] else ready[-1]
+    return format_html(
+        '<img class="{}" src="{}" srcset="{}" sizes="{}" width="{}" '
+        'height="{}" loading="lazy" decoding="async" alt="">',
+        css_class,
+        ready[0].url,
+        ', '.join(f'{thumb.url} {thumb.width}w' for thumb in ready),
+        params['sizes'],
+        shown.width,
+        shown.height,
+    )
@@ -0,0 +1,82 @@
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from django.test import SimpleTestCase, override_settings
+
+from ..cache import feed_timeout
+from ..cache_backends import SQLiteCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = str(Path(self.directory) / 'cache.sqlite3')
+        self.cache = SQLiteCache(self.location, {
+            'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_CHECK_EVERY': 1},
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_set_get_delete(self):
+        self.cache.set('key', {'value': [1, 2]})
+        self.assertEqual(self.cache.get('key'), {'value': [1, 2]})
+        self.assertTrue(self.cache.delete('key'))
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_shared_between_instances(self):
+        """Другой экземпляр (как другой процесс) видит те же данные."""
+        self.cache.set('key', 'value')
+        other = SQLiteCache(self.location, {})
+        self.assertEqual(other.get('key'), 'value')
+
+    def test_add_and_expiry(self):
+        self.assertTrue(self.cache.add('key', 1, timeout=0.01))
+        self.assertFalse(self.cache.add('key', 2))
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 3))
+        self.assertEqual(self.cache.get('key'), 3)
+
+    def test_incr(self):
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter', 5), 6)
+        self.assertEqual(self.cache.decr('counter'), 5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_get_many_and_set_many(self):
+        self.cache.set_many({'a': 1, 'b': 'два'})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 'два'}
+        )
+
+    def test_least_recently_used_entries_are_culled(self):
+        self.cache.set('old', 'value')
+        for i in range(20):
+            self.cache.set(f'key-{i}', i)
+        self.assertIsNone(self.cache.get('old'))
+        self.assertEqual(self.cache.get('key-19'), 19)
+        count = self.cache._connection.execute(
+            'SELECT count(*) FROM cache'
+        ).fetchone()[0]
+        self.assertLessEqual(count, 10)
+
+
+@override_settings(FEED_CACHE_TIMEOUT=3600, FEED_CACHE_LOCAL_TIMEOUT=20)
+class FeedTimeoutTests(SimpleTestCase):
+    def test_process_local_cache_gets_short_ttl(self):
+        """Фрагменты в кэше процесса живут недолго: поколение не общее."""
+        self.assertEqual(feed_timeout(), 20)
+
+    def test_shared_cache_gets_long_ttl(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        shared = {'default': {
+            'BACKEND': 'core.cache_backends.SQLiteCache',
+            'LOCATION': str(Path(directory) / 'cache.sqlite3'),
+        }}
+        with self.settings(CACHES=shared):
+            self.assertEqual(feed_timeout(), 3600)
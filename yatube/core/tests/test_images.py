@@ -0,0 +1,68 @@
+import io
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from core.images import ingest
+
+
+def upload(name, image_format, size, mode='RGB', **params):
+    buffer = io.BytesIO()
+    Image.new(mode, size, 'red').save(buffer, image_format, **params)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+def photo(size=(4000, 3000), orientation=None):
+    exif = Image.Exif()
+    exif[0x010F] = 'Phone'
+    if orientation:
+        exif[0x0112] = orientation
+    return upload('photo.jpg', 'JPEG', size, exif=exif.tobytes())
+
+
+def opened(file):
+    file.seek(0)
+    return Image.open(io.BytesIO(file.read()))
+
+
+@override_settings(
+    IMAGE_MAX_DIMENSION=1000, IMAGE_FORMATS=['WEBP', 'JPEG']
+)
+class IngestTests(SimpleTestCase):
+    def test_photo_is_downscaled_and_reencoded(self):
+        """Большое фото уменьшается, перекодируется и теряет EXIF."""
+        original = photo()
+        file, width, height = ingest(original)
+        self.assertEqual((width, height), (1000, 750))
+        self.assertEqual(file.name, 'photo.webp')
+        self.assertLess(file.size, original.size)
+        image = opened(file)
+        self.assertEqual(image.format, 'WEBP')
+        self.assertEqual(image.size, (1000, 750))
+        self.assertFalse(image.getexif())
+
+    def test_orientation_is_applied(self):
+        """Повёрнутое фото хранится уже повёрнутым."""
+        file, width, height = ingest(photo((400, 300), orientation=6))
+        self.assertEqual((width, height), (300, 400))
+        self.assertEqual(opened(file).size, (300, 400))
+
+    def test_gif_is_kept(self):
+        original = upload('anim.gif', 'GIF', (2000, 10), mode='P')
+        file, width, height = ingest(original)
+        self.assertIs(file, original)
+        self.assertEqual((width, height), (2000, 10))
+
+    def test_small_image_is_not_upscaled(self):
+        file, width, height = ingest(upload('tiny.png', 'PNG', (2, 2)))
+        self.assertEqual((width, height), (2, 2))
+        self.assertEqual(opened(file).size, (2, 2))
+
+    @override_settings(IMAGE_FORMATS=['JPEG'])
+    def test_transparency_needs_png(self):
+        original = upload('logo.png', 'PNG', (3000, 100), mode='RGBA')
+        file, width, height = ingest(original)
+        self.assertEqual(file.name, 'logo.png')
+        self.assertEqual(opened(file).mode, 'RGBA')
+        self.assertEqual((width, height), (1000, 33))
@@ -0,0 +1,117 @@
+import json
+import os
+import re
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+
+from core import metrics
+
+
+def metric(text, name, view):
+    match = re.search(
+        rf'^yatube_{name}{{view="{view}"(?:,le="[^"]+")?}} (\S+)$',
+        text,
+        re.MULTILINE,
+    )
+    return float(match.group(1)) if match else None
+
+
+@override_settings(METRICS_SAMPLE_RATE=1, METRICS_TOKEN='secret')
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='author')
+        Post.objects.create(author=user, text='Тестовый пост')
+
+    def setUp(self):
+        metrics.registry.values.clear()
+        cache.clear()
+
+    def scrape(self):
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_request_is_counted_by_url_name(self):
+        """Запрос учитывается под именем URL со всеми замерами."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        text = self.scrape()
+        view = 'posts:index'
+        self.assertEqual(metric(text, 'requests_total', view), 2)
+        self.assertEqual(metric(text, 'sampled_requests_total', view), 2)
+        self.assertEqual(
+            metric(text, 'request_duration_seconds_count', view), 2
+        )
+        self.assertGreater(
+            metric(text, 'request_duration_seconds_sum', view), 0
+        )
+        self.assertGreater(metric(text, 'db_queries_sum', view), 0)
+        self.assertGreater(
+            metric(text, 'template_duration_seconds_sum', view), 0
+        )
+        # Первый запрос промахивается мимо кэша фрагментов, второй попадает.
+        self.assertGreater(metric(text, 'cache_misses_total', view), 0)
+        self.assertGreater(metric(text, 'cache_hits_total', view), 0)
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 2',
+            text,
+        )
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_unsampled_requests_count_only_latency(self):
+        """Вне выборки пишутся только число и длительность запросов."""
+        self.client.get(reverse('posts:index'))
+        text = self.scrape()
+        self.assertEqual(metric(text, 'requests_total', 'posts:index'), 1)
+        self.assertEqual(
+            metric(text, 'sampled_requests_total', 'posts:index'), 0
+        )
+        self.assertEqual(metric(text, 'db_queries_count', 'posts:index'), 0)
+
+    def test_unresolved_urls_share_one_label(self):
+        self.client.get('/no-such-page/')
+        self.assertEqual(
+            metric(self.scrape(), 'requests_total', 'unknown'), 1
+        )
+
+    def test_endpoint_is_restricted(self):
+        """/metrics открыт по токену, без него — INTERNAL_IPS в DEBUG."""
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 404)
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(
+            url, REMOTE_ADDR='10.0.0.1', HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+        with self.settings(METRICS_TOKEN=None):
+            # За прокси на том же хосте все запросы идут с 127.0.0.1.
+            self.assertEqual(self.client.get(url).status_code, 404)
+            with self.settings(DEBUG=True):
+                self.assertEqual(self.client.get(url).status_code, 200)
+                response = self.client.get(url, REMOTE_ADDR='10.0.0.1')
+                self.assertEqual(response.status_code, 404)
+
+    def test_processes_share_directory(self):
+        """С METRICS_DIR /metrics складывает счётчики всех процессов."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        other = {metrics._key('posts:index', 'requests_total', 'total'): 5}
+        with open(os.path.join(directory.name, '1.json'), 'w') as file:
+            json.dump(other, file)
+        with self.settings(METRICS_DIR=directory.name):
+            self.client.get(reverse('posts:index'))
+            text = self.scrape()
+        self.assertEqual(metric(text, 'requests_total', 'posts:index'), 6)
+        self.assertTrue(os.path.exists(
+            os.path.join(directory.name, f'{os.getpid()}.json')
+        ))
@@ -0,0 +1,74 @@
+import json
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+
+from core import slow_queries
+
+
+def records(logs):
+    return [json.loads(record.getMessage()) for record in logs.records]
+
+
+class SlowQueryLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        slow_queries.install()
+        patcher = mock.patch.object(
+            slow_queries, 'rate_limit', slow_queries.RateLimit()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def slow(self):
+        # Только внутри блока: иначе запросы самого теста попадут в файл.
+        return self.settings(SLOW_QUERY_THRESHOLD=0)
+
+    def test_query_is_logged_with_view_and_plan(self):
+        """Запись содержит SQL, параметры, представление и план."""
+        url = reverse('posts:profile', args=[self.user.username])
+        with self.assertLogs('yatube.slow_queries') as logs, self.slow():
+            self.client.get(url)
+        record = next(
+            record for record in records(logs)
+            if 'posts_post' in record['sql']
+            and record['sql'].lstrip().startswith('SELECT')
+        )
+        self.assertEqual(record['view'], 'posts:profile')
+        self.assertEqual(record['path'], url)
+        self.assertIsInstance(record['params'], list)
+        self.assertTrue(record['plan'])
+        self.assertGreaterEqual(record['duration_ms'], 0)
+        self.assertRegex(record['call_site'], r'^(posts|core)/.+:\d+ in \w+')
+
+    def test_writes_are_logged_without_plan(self):
+        with self.assertLogs('yatube.slow_queries') as logs, self.slow():
+            Post.objects.filter(pk=self.post.pk).update(text='Новый текст')
+        record = records(logs)[-1]
+        self.assertTrue(record['sql'].startswith('UPDATE'))
+        self.assertIsNone(record['plan'])
+        self.assertIsNone(record['view'])
+
+    @override_settings(SLOW_QUERY_THRESHOLD=10 ** 6)
+    def test_fast_queries_are_not_logged(self):
+        with self.assertNoLogs('yatube.slow_queries'):
+            self.client.get(reverse('posts:index'))
+
+    @override_settings(SLOW_QUERY_LOG_RATE=2)
+    def test_rate_limit(self):
+        """Сверх лимита записи пропускаются и подсчитываются."""
+        with self.assertLogs('yatube.slow_queries') as logs, self.slow():
+            for _ in range(5):
+                Post.objects.count()
+        self.assertEqual(len(logs.output), 2)
+        slow_queries.rate_limit.started -= slow_queries.RateLimit.window
+        with self.assertLogs('yatube.slow_queries') as logs, self.slow():
+            Post.objects.count()
+        self.assertEqual(records(logs)[0]['suppressed'], 3)
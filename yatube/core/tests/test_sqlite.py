@@ -0,0 +1,44 @@
+import os
+import sqlite3
+import tempfile
+
+from django.db import connections
+from django.test import TestCase, override_settings
+
+from core import sqlite
+
+PROFILES = {
+    'default': {'journal_mode': 'DELETE'},
+    'test': {
+        'journal_mode': 'WAL',
+        'busy_timeout': 1234,
+        'temp_store': 'MEMORY',
+    },
+}
+
+
+@override_settings(SQLITE_PROFILES=PROFILES, SQLITE_PROFILE='test')
+class SQLiteProfileTests(TestCase):
+    def test_new_connection_gets_profile(self):
+        """Прагмы профиля выполняются при открытии соединения."""
+        connection = connections.create_connection('default')
+        self.addCleanup(connection.close)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 1234)
+            cursor.execute('PRAGMA temp_store')
+            # 2 — MEMORY.
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+    def test_apply_switches_file_to_wal(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        connection = sqlite3.connect(os.path.join(directory.name, 'db'))
+        self.addCleanup(connection.close)
+        sqlite.apply(connection)
+        mode = connection.execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(mode, 'wal')
+        # Режим журнала хранится в файле — вернуть его можно профилем.
+        sqlite.apply(connection, 'default')
+        mode = connection.execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(mode, 'delete')
@@ -0,0 +1,174 @@
+from datetime import timedelta
+
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import tasks
+from core.models import Task
+
+calls = []
+
+
+@tasks.task
+def record(value, suffix=''):
+    calls.append(value + suffix)
+
+
+@tasks.task
+def broken():
+    raise RuntimeError('сломано')
+
+
+def not_a_task():
+    pass
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def enqueue(self, func, *args, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            func.enqueue(*args, **kwargs)
+
+    def test_task_is_created_after_commit(self):
+        """Задача попадает в таблицу только после фиксации транзакции."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            record.enqueue('a')
+            self.assertFalse(Task.objects.exists())
+        callbacks[0]()
+        task = Task.objects.get()
+        self.assertEqual(task.name, 'core.tests.test_tasks.record')
+        self.assertEqual(task.status, Task.QUEUED)
+
+    def test_worker_runs_and_deletes_tasks(self):
+        self.enqueue(record, 'a', suffix='!')
+        self.enqueue(record, 'b')
+        tasks.work(once=True)
+        self.assertEqual(calls, ['a!', 'b'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_key_deduplicates(self):
+        """Пока задача с ключом в очереди, такая же не ставится."""
+        self.enqueue(record, 'a', key='same')
+        self.enqueue(record, 'b', key='same')
+        tasks.work(once=True)
+        self.assertEqual(calls, ['a'])
+        self.enqueue(record, 'c', key='same')
+        tasks.work(once=True)
+        self.assertEqual(calls, ['a', 'c'])
+
+    def test_delayed_task_waits(self):
+        self.enqueue(record, 'a', delay=60)
+        tasks.work(once=True)
+        self.assertEqual(calls, [])
+
+    @override_settings(TASKS_MAX_ATTEMPTS=2, TASKS_RETRY_DELAY=10)
+    def test_failed_task_is_retried_with_backoff(self):
+        """Упавшая задача откладывается, после всех попыток — failed."""
+        self.enqueue(broken)
+        start = timezone.now()
+        with self.assertLogs('core.tasks', 'ERROR'):
+            tasks.work(once=True)
+        task = Task.objects.get()
+        self.assertEqual(task.status, Task.QUEUED)
+        self.assertEqual(task.attempts, 1)
+        self.assertIn('RuntimeError', task.last_error)
+        self.assertGreaterEqual(task.run_at, start + timedelta(seconds=5))
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs('core.tasks', 'ERROR'):
+            tasks.work(once=True)
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.FAILED)
+        self.assertEqual(task.attempts, 2)
+        tasks.work(once=True)
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+
+    @override_settings(TASKS_MAX_ATTEMPTS=1)
+    def test_failed_task_releases_key(self):
+        """Окончательно упавшая задача не занимает свой ключ."""
+        self.enqueue(broken, key='same')
+        with self.assertLogs('core.tasks', 'ERROR'):
+            tasks.work(once=True)
+        failed = Task.objects.get()
+        self.assertEqual(failed.status, Task.FAILED)
+        self.assertIsNone(failed.key)
+        self.enqueue(record, 'a', key='same')
+        tasks.work(once=True)
+        self.assertEqual(calls, ['a'])
+
+    def test_retry_delay_grows(self):
+        with self.settings(TASKS_RETRY_DELAY=10, TASKS_MAX_RETRY_DELAY=60):
+            self.assertLessEqual(tasks.retry_delay(1), 10)
+            self.assertGreaterEqual(tasks.retry_delay(3), 20)
+            self.assertLessEqual(tasks.retry_delay(10), 60)
+
+    def test_visibility_timeout(self):
+        """Забранную задачу не видят другие, пока не истёк таймаут."""
+        self.enqueue(record, 'a')
+        task = tasks.claim()
+        self.assertEqual(task.status, Task.RUNNING)
+        self.assertIsNone(tasks.claim())
+        Task.objects.update(locked_until=timezone.now() - timedelta(1))
+        again = tasks.claim()
+        self.assertEqual(again.pk, task.pk)
+        self.assertEqual(again.attempts, 2)
+        # Опоздавший воркер не трогает задачу, забранную заново.
+        self.assertTrue(tasks.run(task))
+        self.assertTrue(Task.objects.exists())
+        self.assertTrue(tasks.run(again))
+        self.assertFalse(Task.objects.exists())
+
+    def test_only_marked_functions_run(self):
+        Task.objects.create(
+            name='core.tests.test_tasks.not_a_task', max_attempts=1
+        )
+        with self.assertLogs('core.tasks', 'ERROR'):
+            tasks.work(once=True)
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+    QUEUED_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class QueuedEmailTests(TestCase):
+    def test_email_is_sent_by_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            mail.send_mail('Тема', 'Текст', 'from@yatube.ru', ['to@ya.ru'])
+        self.assertEqual(len(mail.outbox), 0)
+        tasks.work(once=True)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Тема')
+        self.assertEqual(mail.outbox[0].to, ['to@ya.ru'])
+
+    def test_message_fields_survive_queue(self):
+        """Письмо хранится полями в JSON и собирается воркером заново."""
+        message = mail.EmailMultiAlternatives(
+            'Тема', 'Текст', 'from@yatube.ru', ['to@ya.ru'],
+            cc=['cc@ya.ru'], bcc=['bcc@ya.ru'], reply_to=['re@ya.ru'],
+            headers={'X-Test': '1'},
+        )
+        message.attach_alternative('<p>Текст</p>', 'text/html')
+        message.attach('data.bin', b'\x00\xff', 'application/octet-stream')
+        message.attach('note.txt', 'заметка', 'text/plain')
+        with self.captureOnCommitCallbacks(execute=True):
+            message.send()
+        self.assertIsInstance(Task.objects.get().args[0], dict)
+        tasks.work(once=True)
+        sent = mail.outbox[0]
+        self.assertEqual(sent.cc, ['cc@ya.ru'])
+        self.assertEqual(sent.bcc, ['bcc@ya.ru'])
+        self.assertEqual(sent.reply_to, ['re@ya.ru'])
+        self.assertEqual(sent.extra_headers, {'X-Test': '1'})
+        self.assertEqual(
+            list(sent.alternatives), [('<p>Текст</p>', 'text/html')]
+        )
+        self.assertEqual(
+            [tuple(attachment) for attachment in sent.attachments],
+            [
+                ('data.bin', b'\x00\xff', 'application/octet-stream'),
+                ('note.txt', 'заметка', 'text/plain'),
+            ],
+        )
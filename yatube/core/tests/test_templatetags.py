@@ -0,0 +1,38 @@
+from django.core.paginator import Paginator
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase
+
+from core.templatetags.user_filters import page_window
+
+
+class PageWindowTests(SimpleTestCase):
+    def test_window_does_not_grow_with_page_count(self):
+        """Ссылок столько же при 100 и при 100 000 страниц."""
+        for count in (1000, 1000000):
+            with self.subTest(count=count):
+                paginator = Paginator(range(count), 10)
+                pages = page_window(paginator.page(50))
+                ellipsis = Paginator.ELLIPSIS
+                self.assertEqual(
+                    pages,
+                    [1, ellipsis, 48, 49, 50, 51, 52, ellipsis,
+                     paginator.num_pages],
+                )
+
+    def test_small_page_count_has_no_gaps(self):
+        paginator = Paginator(range(30), 10)
+        self.assertEqual(page_window(paginator.page(2)), [1, 2, 3])
+
+    def test_paginator_include(self):
+        """В разметке окно страниц, пропуски не ссылки."""
+        page_obj = Paginator(range(100000), 10).page(500)
+        html = Template("{% include 'includes/paginator.html' %}").render(
+            Context({
+                'page_obj': page_obj,
+                'request': RequestFactory().get('/'),
+            })
+        )
+        # Первая, предыдущая, 1, 498, 499, 501, 502, 10000, последняя.
+        self.assertEqual(html.count('href="?page='), 9)
+        self.assertIn('<span class="page-link">500</span>', html)
+        self.assertIn('<span class="page-link">…</span>', html)
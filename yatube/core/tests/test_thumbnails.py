@@ -0,0 +1,177 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from django.template import Context, Template
+from django.test import TestCase, TransactionTestCase, override_settings
+from sorl.thumbnail import default
+from sorl.thumbnail.models import KVStore
+
+from posts.models import Post, User
+
+from core import thumbnails
+from core.models import Task
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=User.objects.create_user(username='author'),
+            image=SimpleUploadedFile(
+                'small.gif', SMALL_GIF, content_type='image/gif'
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # KV-хранилище sorl кэширует записи и между тестами.
+        cache.clear()
+
+    def render_variant(self, variant):
+        return Template(
+            '{% load thumbnails %}{% responsive_image image variant %}'
+        ).render(Context({'image': self.post.image, 'variant': variant}))
+
+    def test_missing_thumbnail_is_scheduled(self):
+        """Недостающие превью ставятся в очередь одной задачей."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.render_variant('card')
+            self.render_variant('detail')
+        task = Task.objects.get()
+        self.assertEqual(task.name, 'core.thumbnails.generate')
+        self.assertEqual(task.args, [self.post.image.name])
+
+    def test_responsive_placeholder(self):
+        """Без превью — заглушка размера карточки, превью в очереди."""
+        with self.captureOnCommitCallbacks(execute=True):
+            html = self.render_variant('card')
+        self.assertIn('width: 200px; height: 200px;', html)
+        self.assertNotIn('<img', html)
+        self.assertTrue(Task.objects.exists())
+
+    def test_responsive_srcset(self):
+        """После генерации выводятся все ширины варианта в srcset."""
+        thumbnails.generate(self.post.image.name)
+        with self.captureOnCommitCallbacks(execute=True):
+            card = self.render_variant('card')
+            detail = self.render_variant('detail')
+        self.assertRegex(
+            card, r'srcset="/media/cache/\S+ 200w, /media/cache/\S+ 400w"'
+        )
+        self.assertIn('sizes="200px" width="200" height="200"', card)
+        self.assertIn('loading="lazy"', card)
+        # Картинка 2×1 не растягивается: все ширины — одно превью.
+        self.assertRegex(detail, r'srcset="/media/cache/\S+ 2w"')
+        self.assertIn('width="2" height="1"', detail)
+        self.assertFalse(Task.objects.exists())
+
+    def test_page_thumbnails_are_read_in_one_batch(self):
+        """Превью многих картинок — один get_many и один запрос на промахи."""
+        posts = [self.post] + [
+            Post.objects.create(
+                text=f'Пост {number}',
+                author=self.post.author,
+                image=SimpleUploadedFile(
+                    f'small{number}.gif', SMALL_GIF, content_type='image/gif'
+                ),
+            )
+            for number in range(2)
+        ]
+        for post in posts:
+            thumbnails.generate(post.image.name)
+        images = [post.image for post in posts]
+        cache.clear()
+        with self.assertNumQueries(1):
+            ready = thumbnails.get_ready_variants(images, 'card')
+        for image in images:
+            found, complete = ready[image.name]
+            self.assertEqual([thumb.width for thumb in found], [200, 400])
+            self.assertTrue(complete)
+        kv_cache = caches['default']
+        with (
+            self.assertNumQueries(0),
+            mock.patch.object(
+                kv_cache, 'get_many', wraps=kv_cache.get_many
+            ) as get_many,
+        ):
+            self.assertEqual(
+                thumbnails.get_ready_variants(images, 'card').keys(),
+                ready.keys(),
+            )
+        get_many.assert_called_once()
+
+    def test_batch_read_does_not_cache_misses(self):
+        """Промах не кэшируется, а значение воркера не затирается."""
+        key = thumbnails._thumbnail_key(
+            self.post.image, '200x200', {'crop': 'center', 'upscale': True}
+        )
+        kv_cache = default.kvstore.cache
+        self.assertEqual(thumbnails._get_many_raw([key]), {})
+        self.assertIsNone(kv_cache.get(key))
+        thumbnails.generate(self.post.image.name)
+        value = kv_cache.get(key)
+        self.assertIsNotNone(value)
+        # Чтение, начатое до записи воркера, видело пустой кэш и
+        # устаревшую строку в базе.
+        KVStore.objects.filter(key=key).update(value='{}')
+        with mock.patch.object(kv_cache, 'get_many', return_value={}):
+            thumbnails._get_many_raw([key])
+        self.assertEqual(kv_cache.get(key), value)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class RenderDoesNotGenerateTests(TransactionTestCase):
+    """Без внешней транзакции on_commit выполняется сразу — как в запросе."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=User.objects.create_user(username='author'),
+            image=SimpleUploadedFile(
+                'small.gif', SMALL_GIF, content_type='image/gif'
+            ),
+        )
+        Task.objects.all().delete()
+
+    def test_pages_only_enqueue(self):
+        with mock.patch.object(
+            thumbnails, 'generate', wraps=thumbnails.generate
+        ) as generate:
+            for url in (
+                reverse('posts:index'),
+                reverse('posts:post_detail', args=[self.post.pk]),
+            ):
+                with self.subTest(url=url):
+                    response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+        generate.assert_not_called()
+        self.assertEqual(Task.objects.get().args, [self.post.image.name])
@@ -0,0 +1,153 @@
+"""Превью картинок, которые готовятся заранее, а не при рендеринге.
+
+sorl-thumbnail по умолчанию создаёт превью прямо в теге {% thumbnail %}:
+при холодном KV-хранилище запрос открывает оригинал через Pillow и ждёт
+ресайза. Здесь превью всех вариантов из settings.IMAGE_VARIANTS
+создаёт задача очереди core.tasks, поставленная сразу после сохранения
+картинки, а шаблоны только читают готовые превью из KV-хранилища.
+
+Превью целой страницы постов читаются из KV-хранилища разом
+(get_ready_variants): один get_many к кэшу и один запрос к базе на
+промахи вместо отдельного обращения на каждое превью.
+"""
+from django.conf import settings
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.models import KVStore
+
+from core.cache import FEED, THUMBNAILS, bump_generation
+from core.tasks import task
+
+
+def thumbnail_options(source, options):
+    """Опции превью с умолчаниями — так же, как их дополняет sorl."""
+    options = dict(options)
+    backend = ThumbnailBackend()
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def variant_sizes(variant):
+    """Геометрии и опции превью варианта картинки, от меньшего."""
+    params = settings.IMAGE_VARIANTS[variant]
+    for width in params['widths']:
+        if params['crop']:
+            yield f'{width}x{width}', {'crop': 'center', 'upscale': True}
+        else:
+            # Больше оригинала не растягиваем: такие превью совпадут.
+            yield f'{width}', {'upscale': False}
+
+
+def _thumbnail_key(file_, geometry, options):
+    """Ключ превью в KV-хранилище — как его строит sorl."""
+    source = ImageFile(file_)
+    options = thumbnail_options(source, options)
+    name = ThumbnailBackend()._get_thumbnail_filename(
+        source, geometry, options
+    )
+    return add_prefix(ImageFile(name, default.storage).key)
+
+
+def _get_many_raw(keys):
+    """KVStore._get_raw() для многих ключей: get_many и один запрос.
+
+    В отличие от sorl промахи не кэшируются: превью вот-вот запишет
+    воркер, а заглушка с таймаутом THUMBNAIL_CACHE_TIMEOUT скрыла бы
+    его надолго. Найденное в базе кладётся в кэш через add, чтобы не
+    затереть значение, записанное воркером после нашего get_many.
+    """
+    if not keys:
+        return {}
+    kv_cache = default.kvstore.cache
+    timeout = sorl_settings.THUMBNAIL_CACHE_TIMEOUT
+    found = kv_cache.get_many(keys)
+    missing = [
+        key for key in keys if found.get(key, EMPTY_VALUE) == EMPTY_VALUE
+    ]
+    if missing:
+        stored = dict(
+            KVStore.objects.filter(key__in=missing).values_list(
+                'key', 'value'
+            )
+        )
+        for key, value in stored.items():
+            if key in found:
+                # Заглушку промаха оставил сам sorl, а превью уже есть.
+                kv_cache.set(key, value, timeout)
+            else:
+                kv_cache.add(key, value, timeout)
+        found.update(stored)
+    return {
+        key: value for key, value in found.items() if value != EMPTY_VALUE
+    }
+
+
+def get_ready_variants(files, variant):
+    """Готовые превью варианта для многих картинок разом.
+
+    {имя файла: (превью по возрастанию ширины, все ли готовы)}.
+    """
+    sizes = list(variant_sizes(variant))
+    keys = {
+        file_.name: [
+            _thumbnail_key(file_, geometry, options)
+            for geometry, options in sizes
+        ]
+        for file_ in files
+    }
+    values = _get_many_raw(
+        [key for file_keys in keys.values() for key in file_keys]
+    )
+    result = {}
+    for name, file_keys in keys.items():
+        ready = [
+            deserialize_image_file(values[key])
+            for key in file_keys if key in values
+        ]
+        by_width = {thumbnail.width: thumbnail for thumbnail in ready}
+        result[name] = (
+            [by_width[width] for width in sorted(by_width)],
+            len(ready) == len(sizes),
+        )
+    return result
+
+
+def get_ready_variant(file_, variant):
+    """get_ready_variants() для одной картинки."""
+    return get_ready_variants([file_], variant)[file_.name]
+
+
+@task
+def generate(name):
+    """Создаёт все превью картинки; выполняется воркером очереди."""
+    for variant in settings.IMAGE_VARIANTS:
+        for geometry, options in variant_sizes(variant):
+            default.backend.get_thumbnail(name, geometry, **options)
+    # В закэшированных фрагментах лент и карточках постов могли
+    # остаться заглушки.
+    bump_generation(FEED, THUMBNAILS)
+
+
+def schedule(image):
+    """Ставит создание превью в очередь после фиксации транзакции.
+
+    Превью никогда не создаются в процессе сайта: тег шаблона, который
+    не нашёл превью, только ставит задачу. Запись воркера в KVStore
+    видна и без общего кэша — промахи читаются из базы (_get_many_raw).
+    """
+    if not image:
+        return
+    name = image.name if hasattr(image, 'name') else str(image)
+    generate.enqueue(name, key=f'thumbnails:{name}')
@@ -1,4 +1,9 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+
+from .metrics import export
 
 
 def page_not_found(request, exception):
@@ -17,3 +22,25 @@ def permission_denied(request, exception):
 
 def server_error(request):
     return render(request, 'core/500.html', status=500)
+
+
+def metrics(request):
+    """Метрики для Prometheus; посторонним — 404.
+
+    Без DEBUG нужен токен: за обратным прокси на том же хосте любой
+    запрос приходит с 127.0.0.1, и INTERNAL_IPS ничего не ограничивают.
+    """
+    if settings.METRICS_TOKEN:
+        allowed = constant_time_compare(
+            request.headers.get('Authorization', ''),
+            f'Bearer {settings.METRICS_TOKEN}',
+        )
+    else:
+        allowed = settings.DEBUG and (
+            request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS
+        )
+    if not allowed:
+        raise Http404
+    return HttpResponse(
+        export(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Follow, Post, Group, Comment
+from .search import search_post_ids
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -15,6 +16,15 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Полнотекстовый индекс вместо LIKE '%...%' по всей таблице.
+        post_ids = search_post_ids(search_term)
+        if post_ids is None:
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(pk__in=post_ids), False
+
 
 admin.site.register(Post, PostAdmin)
 
@@ -0,0 +1,111 @@
+"""Асинхронные версии представлений для чтения.
+
+Подключаются вместо синхронных при ASYNC_VIEWS = True (см. async_urls)
+и работают под ASGI: пока ответ уходит медленному клиенту, процесс
+обслуживает другие запросы. Данные выбираются асинхронным ORM заранее,
+а шаблон рендерится в потоке — теги шаблонов обращаются к кэшу и
+request.user синхронно.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import aget_object_or_404, render
+
+from core.cache import get_generation
+from .conditional import acondition, feed_etag, post_last_modified
+from .counters import get_user_stats
+from .forms import CommentForm
+from .models import Follow, Group, Post, User
+from .timeline import atimeline_page, generation_name
+from .utils import apaginate, comments_paginator
+from .views import COMMENTS_PER_PAGE, NUM_OF_P
+
+arender = sync_to_async(render)
+
+
+@acondition(etag_func=feed_etag)
+async def index(request):
+    title = 'Последние обновления на сайте'
+    posts = Post.objects.with_related()
+    page_obj = await apaginate(request, posts, NUM_OF_P)
+    context = {
+        'title': title,
+        'page_obj': page_obj,
+    }
+    return await arender(request, 'posts/index.html', context)
+
+
+@acondition(etag_func=feed_etag)
+async def group_posts(request, slug):
+    group = await aget_object_or_404(Group, slug=slug)
+    posts = group.posts.with_related()
+    page_obj = await apaginate(request, posts, NUM_OF_P)
+    context = {
+        'group': group,
+        'page_obj': page_obj,
+    }
+    return await arender(request, 'posts/group_list.html', context)
+
+
+@acondition(etag_func=feed_etag)
+async def profile(request, username):
+    author = await aget_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    posts = author.posts.with_related()
+    stats = get_user_stats(author)
+    page_obj = await apaginate(
+        request, posts, NUM_OF_P, count=stats.posts_count
+    )
+    user = await request.auser()
+    if user.is_authenticated:
+        following = await Follow.objects.filter(
+            user=user, author=author).aexists()
+    else:
+        following = False
+    context = {
+        'author': author,
+        'page_obj': page_obj,
+        'num_of_posts': stats.posts_count,
+        'stats': stats,
+        'following': following,
+        'request_user': user,
+    }
+    return await arender(request, 'posts/profile.html', context)
+
+
+@acondition(etag_func=feed_etag, last_modified_func=post_last_modified)
+async def post_detail(request, post_id):
+    post = await aget_object_or_404(
+        Post.objects.with_related().select_related('author__stats'),
+        pk=post_id,
+    )
+    author = post.author
+    num_of_posts = get_user_stats(author).posts_count
+    title = post.text
+    form = CommentForm(
+        request.POST or None)
+    comments = await comments_paginator(
+        request, post.comments.with_related(), COMMENTS_PER_PAGE
+    ).aget_page(request.GET.get('cursor'))
+    context = {
+        'title': title,
+        'post': post,
+        'author': author,
+        'num_of_posts': num_of_posts,
+        'form': form,
+        'comments': comments,
+    }
+    return await arender(request, 'posts/post_detail.html', context)
+
+
+@login_required
+async def follow_index(request):
+    title = 'Ваши последние обновления'
+    page_obj = await atimeline_page(request, NUM_OF_P)
+    user = await request.auser()
+    context = {
+        'title': title,
+        'page_obj': page_obj,
+        'timeline_version': get_generation(generation_name(user.pk)),
+    }
+    return await arender(request, 'posts/follow.html', context)
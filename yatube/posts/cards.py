@@ -0,0 +1,88 @@
+"""Карточки постов для лент с кэшем отрендеренного HTML.
+
+В ключ карточки входят пост, его версия (updated_at и число
+комментариев), поколения автора и группы и вариант карточки. Поэтому
+карточка, отрендеренная один раз, переиспользуется во всех лентах, где
+встречается пост, пока не изменятся он сам, его автор или группа.
+Поколения и карточки всей страницы читаются двумя get_many, превью
+картинок для недостающих карточек — ещё одним.
+"""
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from core import thumbnails
+from core.cache import THUMBNAILS, feed_timeout, get_generations
+
+TEMPLATE = 'includes/post_card.html'
+
+# Вариант картинки из settings.IMAGE_VARIANTS в карточке.
+IMAGE_VARIANT = 'card'
+
+KEY_PREFIX = 'post_card'
+
+# Что показывает карточка в разных лентах: в ленте группы не нужна
+# ссылка на группу, в профиле — автор.
+VARIANTS = {
+    'feed': {'show_author': True, 'show_group': True},
+    'group': {'show_author': True, 'show_group': False},
+    'profile': {'show_author': False, 'show_group': True},
+}
+
+
+def author_generation(user_id):
+    return f'author:{user_id}'
+
+
+def group_generation(group_id):
+    return f'group:{group_id}'
+
+
+def _generation_names(post):
+    names = [author_generation(post.author_id)]
+    if post.group_id:
+        names.append(group_generation(post.group_id))
+    if post.image:
+        # Пока превью не готово, в карточке заглушка.
+        names.append(THUMBNAILS)
+    return names
+
+
+def card_key(post, variant, generations):
+    parts = [
+        variant,
+        post.pk,
+        post.updated_at.timestamp(),
+        post.comments_count,
+        *(generations[name] for name in _generation_names(post)),
+    ]
+    return ':'.join(map(str, [KEY_PREFIX, *parts]))
+
+
+def render_cards(posts, variant='feed'):
+    """HTML карточек постов в том же порядке."""
+    posts = list(posts)
+    generations = get_generations({
+        name for post in posts for name in _generation_names(post)
+    })
+    keys = [card_key(post, variant, generations) for post in posts]
+    cards = cache.get_many(keys)
+    missing = [
+        (post, key) for post, key in zip(posts, keys) if key not in cards
+    ]
+    if missing:
+        template = get_template(TEMPLATE)
+        images = thumbnails.get_ready_variants(
+            [post.image for post, _ in missing if post.image], IMAGE_VARIANT
+        )
+        rendered = {
+            key: template.render({
+                'post': post,
+                'image': images.get(post.image.name),
+                **VARIANTS[variant],
+            })
+            for post, key in missing
+        }
+        cache.set_many(rendered, feed_timeout())
+        cards.update(rendered)
+    return [mark_safe(cards[key]) for key in keys]
@@ -0,0 +1,75 @@
+"""Валидаторы для условных GET-запросов (ETag / Last-Modified).
+
+Валидаторы считаются без рендеринга страницы: ETag строится из номера
+поколения лент (core.cache), пользователя и адреса страницы, а
+Last-Modified поста — из времени его правки и последнего комментария.
+
+Номер поколения годится для ETag, только если кэш общий для всех
+процессов. В кэше памяти процесса воркер, не обработавший правку,
+держал бы старый номер и отвечал бы 304 на устаревшую страницу, поэтому
+без общего кэша ETag не выдаётся.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db.models import Max
+from django.http import HttpResponse
+from django.views.decorators.http import condition
+
+from core.cache import FEED, get_generation, is_shared
+
+from .models import Post
+
+
+def make_etag(request, *parts):
+    if not is_shared():
+        return None
+    raw = '|'.join(str(part) for part in (
+        get_generation(FEED),
+        request.user.pk,
+        request.get_full_path(),
+        *parts,
+    ))
+    return hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def feed_etag(request, *args, **kwargs):
+    return make_etag(request)
+
+
+def post_last_modified(request, post_id):
+    values = Post.objects.filter(pk=post_id).annotate(
+        last_comment=Max('comments__created')
+    ).values_list('updated_at', 'last_comment').first()
+    if values is None:
+        return None
+    return max(value for value in values if value is not None)
+
+
+def acondition(etag_func=None, last_modified_func=None):
+    """condition() для асинхронных представлений.
+
+    Валидаторы обращаются к ORM и request.user синхронно, поэтому
+    проверка выполняется в потоке: condition() оборачивает пустое
+    представление, и если оно не ответило 304/412, вызывается настоящее.
+    """
+    def decorator(view):
+        @condition(etag_func=etag_func, last_modified_func=last_modified_func)
+        def check(request, *args, **kwargs):
+            return HttpResponse()
+
+        check = sync_to_async(check)
+
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            probe = await check(request, *args, **kwargs)
+            if probe.status_code != 200:
+                return probe
+            response = await view(request, *args, **kwargs)
+            for header in ('ETag', 'Last-Modified'):
+                if header in probe:
+                    response.headers.setdefault(header, probe[header])
+            return response
+        return inner
+    return decorator
@@ -0,0 +1,112 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются атомарными UPDATE с F-выражениями, поэтому
+параллельные запросы не теряют приращений. Расхождения (например,
+после bulk_create или правки базы руками) исправляет команда
+reconcile_counters.
+"""
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def get_user_stats(user):
+    """Счётчики пользователя; если строки ещё нет — нулевые, без записи."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return UserStats(user=user)
+
+
+def change_user_stats(user_id, **deltas):
+    """Прибавляет deltas к счётчикам пользователя, не уходя ниже нуля."""
+    updates = {
+        field: Greatest(F(field) + delta, Value(0))
+        for field, delta in deltas.items()
+    }
+    updated = UserStats.objects.filter(user_id=user_id).update(**updates)
+    # Строки может не быть у пользователей, созданных в обход сигналов;
+    # при удалении (каскадом вместе с пользователем) её не создаём.
+    if not updated and any(delta > 0 for delta in deltas.values()):
+        UserStats.objects.get_or_create(user_id=user_id)
+        UserStats.objects.filter(user_id=user_id).update(**updates)
+
+
+def change_comments_count(post_id, delta):
+    updates = {
+        'comments_count': Greatest(F('comments_count') + delta, Value(0)),
+    }
+    if delta < 0:
+        # Last-Modified поста — позднейшее из updated_at и времени
+        # последнего комментария; после удаления комментария оно не
+        # должно уйти назад.
+        updates['updated_at'] = timezone.now()
+    Post.objects.filter(pk=post_id).update(**updates)
+
+
+def _count(model, field):
+    """Подзапрос: число строк model, где field ссылается на внешнюю строку."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def _pk_batches(queryset, batch_size):
+    last_pk = 0
+    while True:
+        pks = list(queryset.filter(pk__gt=last_pk).order_by('pk').values_list(
+            'pk', flat=True
+        )[:batch_size])
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+def reconcile_user_stats(batch_size):
+    """Пересчитывает счётчики пользователей; возвращает число исправленных."""
+    fixed = 0
+    for pks in _pk_batches(User.objects.all(), batch_size):
+        users = User.objects.filter(pk__in=pks).annotate(
+            real_posts=_count(Post, 'author'),
+            real_followers=_count(Follow, 'author'),
+            real_following=_count(Follow, 'user'),
+        ).values_list('pk', 'real_posts', 'real_followers', 'real_following')
+        stats = {
+            item.user_id: item
+            for item in UserStats.objects.filter(user_id__in=pks)
+        }
+        changed = []
+        for pk, posts, followers, following in users:
+            item = stats.get(pk) or UserStats.objects.create(user_id=pk)
+            real = (posts, followers, following)
+            if real != (item.posts_count, item.followers_count,
+                        item.following_count):
+                (item.posts_count, item.followers_count,
+                 item.following_count) = real
+                changed.append(item)
+        UserStats.objects.bulk_update(
+            changed, ['posts_count', 'followers_count', 'following_count']
+        )
+        fixed += len(changed)
+    return fixed
+
+
+def reconcile_comments_count(batch_size):
+    """Пересчитывает счётчики комментариев; возвращает число исправленных."""
+    fixed = 0
+    for pks in _pk_batches(Post.objects.all(), batch_size):
+        posts = Post.objects.filter(pk__in=pks).annotate(
+            real_comments=_count(Comment, 'post'),
+        ).exclude(comments_count=F('real_comments')).only('pk')
+        changed = []
+        for post in posts:
+            post.comments_count = post.real_comments
+            changed.append(post)
+        Post.objects.bulk_update(changed, ['comments_count'])
+        fixed += len(changed)
+    return fixed
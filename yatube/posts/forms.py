@@ -1,5 +1,7 @@
 from django import forms
-from .models import Post, Comment
+from django.core.files.uploadedfile import UploadedFile
+from core.images import ingest
+from .models import Group, Post, Comment
 from django.core.exceptions import ValidationError
 
 
@@ -16,6 +18,19 @@ class PostForm(forms.ModelForm):
             'group': ('Выберите группу поста (опционально)')
         }
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            image, width, height = ingest(image)
+            self.instance.image_width = width
+            self.instance.image_height = height
+            self.instance.image_bytes = image.size
+        elif not image:
+            self.instance.image_width = None
+            self.instance.image_height = None
+            self.instance.image_bytes = None
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -28,3 +43,15 @@ class CommentForm(forms.ModelForm):
         if data == '':
             raise ValidationError
         return data
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label='Поиск', max_length=200, required=False)
+    group = forms.ModelChoiceField(
+        label='Группа',
+        queryset=Group.objects.all(),
+        to_field_name='slug',
+        required=False,
+        empty_label='Все группы',
+    )
+    author = forms.CharField(label='Автор', max_length=150, required=False)
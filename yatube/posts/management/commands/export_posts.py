@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Выгружает группы, пользователей, посты, комментарии и подписки.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл JSONL для выгрузки.')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько строк читать из базы за раз.',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Продолжить с последней контрольной точки.',
+        )
+
+    def handle(self, *args, **options):
+        written = transfer.export_records(
+            options['path'],
+            options['batch_size'],
+            resume=options['resume'],
+            progress=self.progress,
+        )
+        self.stdout.write(f'Выгружено записей: {written}')
+
+    def progress(self, section, count):
+        self.stderr.write(f'{section}: всего {count}')
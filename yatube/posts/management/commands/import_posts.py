@@ -0,0 +1,45 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from core.cache import FEED, bump_generation
+from posts import counters, transfer
+
+
+class Command(BaseCommand):
+    help = 'Загружает данные, выгруженные командой export_posts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл JSONL для загрузки.')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько записей вставлять одним запросом.',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Продолжить с последней контрольной точки.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        try:
+            read = transfer.import_records(
+                options['path'],
+                batch_size,
+                resume=options['resume'],
+                progress=self.progress,
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        self.stdout.write(f'Загружено записей: {read}')
+        # bulk_create не вызывает сигналы: счётчики и ленты подписок
+        # пересчитываются целиком.
+        counters.reconcile_user_stats(batch_size)
+        counters.reconcile_comments_count(batch_size)
+        call_command('rebuild_timelines', stdout=self.stdout)
+        bump_generation(FEED)
+
+    def progress(self, section, count):
+        self.stderr.write(f'{section}: всего {count}')
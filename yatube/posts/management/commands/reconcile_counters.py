@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Сверяет денормализованные счётчики с данными и исправляет их.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько строк проверять за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        users = counters.reconcile_user_stats(batch_size)
+        self.stdout.write(f'Исправлено счётчиков пользователей: {users}')
+        posts = counters.reconcile_comments_count(batch_size)
+        self.stdout.write(f'Исправлено счётчиков комментариев: {posts}')
@@ -1,9 +1,36 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 
+class AtomicSaveMixin:
+    """save() вместе с обработчиками post_save — одна транзакция.
+
+    Сигналы поддерживают счётчики (posts.counters): без общей транзакции
+    ошибка между записью строки и UPDATE счётчика оставила бы счётчик
+    неверным. delete() атомарен и так: Collector шлёт post_delete внутри
+    своей транзакции.
+    """
+
+    def save(self, *args, using=None, **kwargs):
+        using = using or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, using=using, **kwargs)
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, которые поддерживаются сигналами."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(
@@ -16,7 +43,13 @@ class Group(models.Model):
         return self.title
 
 
-class Post(models.Model):
+class PostQuerySet(models.QuerySet):
+    def with_related(self):
+        """Посты вместе с автором и группой — одним запросом."""
+        return self.select_related('author', 'group')
+
+
+class Post(AtomicSaveMixin, models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField(auto_now_add=True)
     author = models.ForeignKey(
@@ -36,12 +69,42 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    # Заполняются при загрузке картинки (core.images.ingest).
+    image_width = models.PositiveIntegerField(null=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, editable=False)
+    image_bytes = models.PositiveIntegerField(null=True, editable=False)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                name='post_pub_date_idx',
+                fields=['pub_date', 'id'],
+            ),
+            models.Index(
+                name='post_author_pub_date_idx',
+                fields=['author', 'pub_date'],
+            ),
+            models.Index(
+                name='post_group_pub_date_idx',
+                fields=['group', 'pub_date'],
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
 
-class Comment(models.Model):
+class CommentQuerySet(models.QuerySet):
+    def with_related(self):
+        """Комментарии вместе с авторами — одним запросом."""
+        return self.select_related('author')
+
+
+class Comment(AtomicSaveMixin, models.Model):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
@@ -55,8 +118,18 @@ class Comment(models.Model):
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
 
+    objects = CommentQuerySet.as_manager()
 
-class Follow(models.Model):
+    class Meta:
+        indexes = [
+            models.Index(
+                name='comment_post_created_idx',
+                fields=['post', 'created'],
+            ),
+        ]
+
+
+class Follow(AtomicSaveMixin, models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -75,3 +148,38 @@ class Follow(models.Model):
                 fields=['user', 'author'],
             ),
         ]
+        indexes = [
+            models.Index(
+                name='follow_author_user_idx',
+                fields=['author', 'user'],
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                name='unique_timeline_entry',
+                fields=['user', 'post'],
+            ),
+        ]
+        indexes = [
+            models.Index(
+                name='timeline_user_pub_date_idx',
+                fields=['user', '-pub_date', '-post'],
+            ),
+        ]
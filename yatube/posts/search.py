@@ -0,0 +1,159 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Индекс — внешняя FTS5-таблица поверх posts_post: сам текст в ней не
+хранится, а синхронизацию с Post.text ведут триггеры базы, поэтому
+индекс не отстаёт и при QuerySet.update(). На других СУБД поиск
+откатывается к LIKE.
+
+Схема пересоздаётся идемпотентно после каждой миграции: SQLite меняет
+таблицу posts_post пересозданием, и её триггеры при этом теряются.
+"""
+import re
+
+from django.db import connection as default_connection
+from django.db.models import F, FloatField, TextField, Value
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+
+SEARCH_ORDERING = ('rank', '-pk')
+
+SNIPPET_TOKENS = 24
+
+# Управляющие символы не встречаются в тексте постов, поэтому ими
+# удобно отметить совпадения до экранирования HTML.
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+WORD_RE = re.compile(r'\w+')
+
+
+def _schema(table):
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"text, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai "
+        f"AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); "
+        f"END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad "
+        f"AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+        f"VALUES ('delete', old.id, old.text); "
+        f"END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au "
+        f"AFTER UPDATE OF text ON {table} BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+        f"VALUES ('delete', old.id, old.text); "
+        f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); "
+        f"END",
+    ]
+
+
+def is_available(connection=None):
+    return (connection or default_connection).vendor == 'sqlite'
+
+
+def install(connection, table=Post._meta.db_table):
+    """Создаёт FTS-таблицу и триггеры, если их ещё нет."""
+    if not is_available(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM sqlite_master WHERE name = %s', [FTS_TABLE]
+        )
+        exists = cursor.fetchone()
+        for statement in _schema(table):
+            cursor.execute(statement)
+        if not exists:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+            )
+    return True
+
+
+def uninstall(connection):
+    if not is_available(connection):
+        return
+    with connection.cursor() as cursor:
+        for suffix in ('ai', 'ad', 'au'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def rebuild(connection=None):
+    """Переиндексирует все посты."""
+    connection = connection or default_connection
+    install(connection)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+        )
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"
+        )
+
+
+def match_expression(query):
+    """Запрос пользователя в синтаксисе FTS5: все слова, по префиксу.
+
+    Слова берутся в кавычки, поэтому операторы и скобки из ввода
+    не ломают синтаксис MATCH.
+    """
+    return ' '.join(f'"{word}"*' for word in WORD_RE.findall(query))
+
+
+def search_posts(query, queryset=None):
+    """Посты, подходящие под запрос, с рангом и фрагментом текста.
+
+    rank меньше — совпадение лучше (bm25 в SQLite отрицателен).
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    expression = match_expression(query)
+    if not expression:
+        return queryset.none()
+    if not is_available():
+        return queryset.filter(text__icontains=query.strip()).annotate(
+            rank=Value(0.0, output_field=FloatField()),
+            snippet=F('text'),
+        )
+    table = queryset.model._meta.db_table
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[
+            f'{FTS_TABLE}.rowid = {table}.id',
+            f'{FTS_TABLE} MATCH %s',
+        ],
+        params=[expression],
+    ).annotate(
+        rank=RawSQL(f'bm25({FTS_TABLE})', (), output_field=FloatField()),
+        snippet=RawSQL(
+            f"snippet({FTS_TABLE}, 0, %s, %s, '…', %s)",
+            (MARK_START, MARK_END, SNIPPET_TOKENS),
+            output_field=TextField(),
+        ),
+    )
+
+
+def search_post_ids(query):
+    """Подзапрос с id найденных постов — для фильтра pk__in."""
+    expression = match_expression(query)
+    if not is_available() or not expression:
+        return None
+    return RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        (expression,),
+    )
+
+
+def highlight(snippet):
+    """Фрагмент с совпадениями в <mark>; остальной текст экранирован."""
+    html = escape(snippet or '')
+    html = html.replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+    return mark_safe(html)
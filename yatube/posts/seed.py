@@ -0,0 +1,207 @@
+"""Синтетические данные в объёмах, близких к боевым.
+
+Всё пишется через bulk_create пачками. Популярность авторов
+распределена по закону Ципфа: немногие авторы собирают большую часть
+подписчиков и комментариев, как на настоящих площадках. Счётчики,
+ленты подписок и поисковый индекс после генерации пересчитываются
+теми же функциями, что и в эксплуатации.
+"""
+import bisect
+import itertools
+import random
+from datetime import timedelta
+
+from django.utils import timezone
+
+from core.cache import FEED, bump_generation
+
+from . import counters, timeline
+from .models import Comment, Follow, Group, Post, User
+from .transfer import original_dates
+
+# Хэш, под которым нельзя войти: make_password() на миллионах
+# пользователей занял бы часы.
+UNUSABLE_PASSWORD = '!seed'
+
+# Комментарии достаются только самым свежим постам.
+COMMENTED_POSTS = 100_000
+
+WORDS = (
+    'котики погода город музыка книга фильм поход море горы утро вечер '
+    'работа отпуск кофе чай дождь снег весна лето осень зима друзья '
+    'python django база запрос лента подписка новости фото'
+).split()
+
+
+class Zipf:
+    """Выбор индексов 0..n-1 с весами 1 / (i + 1) ** s."""
+
+    def __init__(self, n, s, rng):
+        self.rng = rng
+        self.cumulative = list(itertools.accumulate(
+            1 / (i + 1) ** s for i in range(n)
+        ))
+
+    def __call__(self):
+        point = self.rng.random() * self.cumulative[-1]
+        return bisect.bisect(self.cumulative, point)
+
+    def sample(self, k):
+        """k различных индексов (или меньше, если столько не набрать)."""
+        chosen = set()
+        for _ in range(k * 4):
+            chosen.add(self())
+            if len(chosen) >= k:
+                break
+        return chosen
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def _text(rng, words):
+    return ' '.join(rng.choices(WORDS, k=words)).capitalize()
+
+
+def seed_users(count, prefix, batch_size):
+    start = User.objects.filter(username__startswith=prefix).count()
+    users = (
+        User(
+            username=f'{prefix}{number}',
+            first_name='Имя',
+            last_name=f'Фамилия{number}',
+            password=UNUSABLE_PASSWORD,
+        )
+        for number in range(start, start + count)
+    )
+    for batch in _batches(users, batch_size):
+        User.objects.bulk_create(batch)
+    return list(
+        User.objects.filter(username__startswith=prefix)
+        .order_by('pk').values_list('pk', flat=True)
+    )
+
+
+def seed_groups(count, prefix, batch_size):
+    start = Group.objects.filter(slug__startswith=prefix).count()
+    groups = (
+        Group(
+            title=f'Группа {number}',
+            slug=f'{prefix}-{number}',
+            description='Сгенерированная группа',
+        )
+        for number in range(start, start + count)
+    )
+    for batch in _batches(groups, batch_size):
+        Group.objects.bulk_create(batch)
+    return list(
+        Group.objects.filter(slug__startswith=prefix)
+        .values_list('pk', flat=True)
+    )
+
+
+def seed_posts(count, user_ids, group_ids, skew, days, rng, batch_size):
+    authors = Zipf(len(user_ids), skew, rng)
+    now = timezone.now()
+    span = timedelta(days=days).total_seconds()
+
+    def posts():
+        for _ in range(count):
+            pub_date = now - timedelta(seconds=rng.random() * span)
+            group = rng.choice(group_ids) if group_ids and (
+                rng.random() < 0.5
+            ) else None
+            yield Post(
+                text=_text(rng, rng.randint(5, 60)),
+                author_id=user_ids[authors()],
+                group_id=group,
+                pub_date=pub_date,
+                updated_at=pub_date,
+            )
+
+    with original_dates():
+        for batch in _batches(posts(), batch_size):
+            Post.objects.bulk_create(batch)
+
+
+def seed_follows(count, user_ids, skew, rng, batch_size):
+    """Подписки: читатели равновероятны, авторы — по Ципфу."""
+    authors = Zipf(len(user_ids), skew, rng)
+    per_user = max(1, count // len(user_ids))
+    # На себя не подписываются: пар не больше n * (n - 1), а единственному
+    # пользователю подписываться не на кого.
+    count = min(count, len(user_ids) * (len(user_ids) - 1))
+
+    def follows():
+        made = 0
+        while made < count:
+            user_id = rng.choice(user_ids)
+            for index in authors.sample(min(per_user, count - made)):
+                if user_ids[index] != user_id:
+                    made += 1
+                    yield Follow(user_id=user_id, author_id=user_ids[index])
+
+    for batch in _batches(follows(), batch_size):
+        Follow.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def seed_comments(count, user_ids, skew, rng, batch_size):
+    """Комментарии: чаще к свежим постам."""
+    post_ids = list(
+        Post.objects.order_by('-pub_date')
+        .values_list('pk', flat=True)[:COMMENTED_POSTS]
+    )
+    if not post_ids:
+        return
+    popular = Zipf(len(post_ids), skew, rng)
+    comments = (
+        Comment(
+            post_id=post_ids[popular()],
+            author_id=rng.choice(user_ids),
+            text=_text(rng, rng.randint(3, 20)),
+        )
+        for _ in range(count)
+    )
+    for batch in _batches(comments, batch_size):
+        Comment.objects.bulk_create(batch)
+
+
+def finish(batch_size, timeline_users):
+    """Пересчитывает то, что при обычной работе ведут сигналы.
+
+    Ленты подписок материализуются только для timeline_users читателей:
+    полная раскладка миллионов подписок заняла бы больше места, чем все
+    остальные данные.
+    """
+    counters.reconcile_user_stats(batch_size)
+    counters.reconcile_comments_count(batch_size)
+    followers = Follow.objects.values_list(
+        'user_id', flat=True
+    ).distinct().order_by('user_id')[:timeline_users]
+    for user_id in followers:
+        timeline.rebuild(user_id)
+    bump_generation(FEED)
+
+
+def seed(users, groups, posts, follows, comments, skew=1.1, days=365,
+         prefix='seed', batch_size=1000, random_seed=0,
+         timeline_users=100, progress=None):
+    progress = progress or (lambda message: None)
+    rng = random.Random(random_seed)
+    user_ids = seed_users(users, prefix, batch_size)
+    progress(f'Пользователей: {len(user_ids)}')
+    group_ids = seed_groups(groups, prefix, batch_size)
+    progress(f'Групп: {len(group_ids)}')
+    if not user_ids:
+        return
+    seed_posts(posts, user_ids, group_ids, skew, days, rng, batch_size)
+    progress(f'Постов: {Post.objects.count()}')
+    seed_follows(follows, user_ids, skew, rng, batch_size)
+    progress(f'Подписок: {Follow.objects.count()}')
+    seed_comments(comments, user_ids, skew, rng, batch_size)
+    progress(f'Комментариев: {Comment.objects.count()}')
+    finish(batch_size, timeline_users)
+    progress('Счётчики и ленты пересчитаны')
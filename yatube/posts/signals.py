@@ -0,0 +1,92 @@
+from django.db import connections
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from core.cache import FEED, bump_generation
+
+from . import cards, counters, search, timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+SEARCH_MIGRATION = '0012_post_search'
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        counters.change_user_stats(instance.author_id, posts_count=1)
+        timeline.fan_out(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change_user_stats(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        counters.change_comments_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        counters.change_user_stats(instance.user_id, following_count=1)
+        counters.change_user_stats(instance.author_id, followers_count=1)
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_user_stats(instance.user_id, following_count=-1)
+    counters.change_user_stats(instance.author_id, followers_count=-1)
+    timeline.trim(instance.user_id, instance.author_id)
+
+
+@receiver([post_save, post_delete], sender=Post)
+@receiver([post_save, post_delete], sender=Group)
+@receiver([post_save, post_delete], sender=Comment)
+# Подписка меняет кнопку и счётчики подписчиков в профиле автора.
+@receiver([post_save, post_delete], sender=Follow)
+def invalidate_feeds(sender, **kwargs):
+    bump_generation(FEED)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_cards(sender, instance, update_fields, **kwargs):
+    # Вход пользователя обновляет только last_login — карточки не меняются.
+    if update_fields is None or set(update_fields) - {'last_login'}:
+        bump_generation(FEED, cards.author_generation(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=Group)
+def invalidate_group_cards(sender, instance, **kwargs):
+    bump_generation(cards.group_generation(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=Follow)
+def invalidate_timeline(sender, instance, **kwargs):
+    bump_generation(timeline.generation_name(instance.user_id))
+
+
+@receiver(post_migrate)
+def install_search(sender, using, **kwargs):
+    # Пересоздание posts_post в SQLite удаляет триггеры поискового индекса.
+    if sender.name != 'posts':
+        return
+    connection = connections[using]
+    applied = MigrationRecorder(connection).applied_migrations()
+    if ('posts', SEARCH_MIGRATION) in applied:
+        search.install(connection)
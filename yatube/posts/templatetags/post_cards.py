@@ -0,0 +1,11 @@
+from django import template
+
+from posts.cards import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, variant='feed'):
+    """Карточки постов из кэша: {% post_cards page_obj 'feed' as cards %}."""
+    return render_cards(posts, variant)
@@ -0,0 +1,101 @@
+from unittest import mock
+
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import include, path, reverse
+
+from ..models import Follow, Group, Post, User, UserStats
+
+urlpatterns = [
+    path('auth/', include('users.urls', namespace='users')),
+    path('auth/', include('django.contrib.auth.urls')),
+    path('about/', include('about.urls', namespace='about')),
+    path('', include('posts.async_urls', namespace='posts')),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='test-slug', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {index}', author=cls.author, group=cls.group
+            )
+            for index in range(13)
+        ]
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.client = AsyncClient()
+
+    async def test_feed_pages(self):
+        """Асинхронные ленты отдают те же посты, что и синхронные."""
+        newest = self.posts[::-1][:10]
+        await self.client.aforce_login(self.user)
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:follow_index'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = await self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(list(response.context['page_obj']), newest)
+
+    async def test_stale_counter_does_not_hide_posts(self):
+        await UserStats.objects.filter(user=self.author).aupdate(
+            posts_count=3
+        )
+        response = await self.client.get(
+            reverse('posts:profile', kwargs={'username': 'author'})
+        )
+        page_obj = response.context['page_obj']
+        self.assertEqual(list(page_obj), self.posts[::-1][:10])
+        self.assertTrue(page_obj.has_next())
+
+    async def test_cursor_and_page_pagination(self):
+        url = reverse('posts:index')
+        response = await self.client.get(url, {'page': 2})
+        self.assertEqual(len(response.context['page_obj']), 3)
+        cursor = response.context['page_obj'].next_cursor
+        self.assertIsNone(cursor)
+        response = await self.client.get(url)
+        cursor = response.context['page_obj'].next_cursor
+        response = await self.client.get(url, {'cursor': cursor})
+        self.assertEqual(
+            list(response.context['page_obj']), self.posts[2::-1]
+        )
+
+    @mock.patch('posts.conditional.is_shared', return_value=True)
+    async def test_post_detail_conditional_get(self, is_shared):
+        post = self.posts[0]
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        response = await self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['post'], post)
+        response = await self.client.get(
+            url, headers={'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_follow_index_requires_login(self):
+        response = await self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 302)
+
+    async def test_missing_objects(self):
+        for url in (
+            reverse('posts:group_list', kwargs={'slug': 'missing'}),
+            reverse('posts:profile', kwargs={'username': 'missing'}),
+            reverse('posts:post_detail', kwargs={'post_id': 999}),
+        ):
+            with self.subTest(url=url):
+                response = await self.client.get(url)
+                self.assertEqual(response.status_code, 404)
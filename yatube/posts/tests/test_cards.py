@@ -0,0 +1,96 @@
+from unittest import mock
+
+from django.contrib.auth import user_logged_in
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from ..cards import render_cards
+from ..models import Comment, Group, Post, User
+
+
+class PostCardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='author', first_name='Имя', last_name='Фамилия'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Тестовый пост', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def card(self, variant='feed'):
+        post = Post.objects.with_related().get(pk=self.post.pk)
+        return render_cards([post], variant)[0]
+
+    def assertCached(self, variant='feed'):
+        with mock.patch('posts.cards.get_template') as get_template:
+            card = self.card(variant)
+        get_template.assert_not_called()
+        return card
+
+    def test_card_is_rendered_once(self):
+        """Повторная выдача карточки не рендерит шаблон."""
+        card = self.card()
+        self.assertIn('Тестовый пост', card)
+        self.assertEqual(self.assertCached(), card)
+
+    def test_variants(self):
+        feed, group, profile = (
+            self.card(variant) for variant in ('feed', 'group', 'profile')
+        )
+        self.assertIn('Автор: Имя Фамилия', feed)
+        self.assertIn('все записи группы', feed)
+        self.assertNotIn('все записи группы', group)
+        self.assertNotIn('Автор:', profile)
+
+    def test_post_change_invalidates_card(self):
+        self.card()
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Новый текст'
+        post.save()
+        self.assertIn('Новый текст', self.card())
+
+    def test_comment_invalidates_card(self):
+        self.card()
+        Comment.objects.create(post=self.post, author=self.user, text='Да')
+        self.assertIn('Комментариев: 1', self.card())
+
+    def test_author_change_invalidates_card(self):
+        self.card()
+        self.user.first_name = 'Другое'
+        self.user.save()
+        self.assertIn('Автор: Другое Фамилия', self.card())
+
+    def test_group_change_invalidates_card(self):
+        self.card()
+        self.group.title = 'Переименованная'
+        self.group.save()
+        self.assertIn('Переименованная', self.card())
+
+    def test_login_keeps_card(self):
+        """Обновление last_login при входе карточки не сбрасывает."""
+        self.card()
+        request = RequestFactory().get('/')
+        user_logged_in.send(sender=User, request=request, user=self.user)
+        self.assertCached()
+
+    def test_feeds_use_cards(self):
+        """Ленты выводят карточки своего варианта."""
+        pages = {
+            reverse('posts:index'): 'все записи группы',
+            reverse('posts:group_list', args=[self.group.slug]): 'Автор:',
+            reverse('posts:profile', args=[self.user.username]):
+                'все записи группы',
+        }
+        for url, text in pages.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Тестовый пост')
+                self.assertContains(response, text)
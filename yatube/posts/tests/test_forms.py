@@ -1,3 +1,4 @@
+import io
 import shutil
 import tempfile
 
@@ -5,6 +6,7 @@ from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from ..models import Group, Post, User, Comment
 
@@ -74,6 +76,21 @@ class PostsCreateTests(TestCase):
         self.assertEqual(last_post.author, self.user)
         self.assertEqual(last_post.image, 'posts/small.gif')
 
+    @override_settings(IMAGE_MAX_DIMENSION=100, IMAGE_FORMATS=['WEBP'])
+    def test_uploaded_photo_is_ingested(self):
+        """Фото сохраняется уменьшенным, с размерами и весом в модели."""
+        buffer = io.BytesIO()
+        Image.new('RGB', (400, 200), 'red').save(buffer, 'JPEG')
+        uploaded = SimpleUploadedFile('photo.jpg', buffer.getvalue())
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Фото', 'image': uploaded},
+        )
+        post = Post.objects.get(text='Фото')
+        self.assertEqual(post.image.name, 'posts/photo.webp')
+        self.assertEqual((post.image_width, post.image_height), (100, 50))
+        self.assertEqual(post.image_bytes, post.image.size)
+
     def test_edit_post(self):
         """При отправке валидной формы редактирования меняется пост в БД."""
         form_data = {
@@ -1,7 +1,13 @@
+from io import StringIO
+from unittest import mock, skipUnless
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, TransactionTestCase
 
-from ..models import Group, Post
+from ..models import Comment, Follow, Group, Post, UserStats
+from ..timeline import TIMELINE_ORDERING, timeline_entries
 
 User = get_user_model()
 
@@ -32,3 +38,139 @@ class PostModelTest(TestCase):
         group = PostModelTest.group
         expected_object_name = group.title
         self.assertEqual(expected_object_name, str(group))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN есть в SQLite')
+class IndexUsageTest(TestCase):
+    """Горячие запросы лент читают индекс, а не сортируют во временном
+    B-дереве."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            group=cls.group,
+            text='Тестовый текст',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def get_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return ' / '.join(row[-1] for row in cursor.fetchall())
+
+    def test_hot_queries_use_indexes(self):
+        ordering = ('-pub_date', '-pk')
+        querysets = {
+            'index': Post.objects.order_by(*ordering)[:10],
+            'group': self.group.posts.order_by(*ordering)[:10],
+            'profile': self.user.posts.order_by(*ordering)[:10],
+            'follow': timeline_entries(self.reader).order_by(
+                *TIMELINE_ORDERING
+            )[:10],
+            'comments': self.post.comments.order_by('created', 'pk'),
+            'followers': Follow.objects.filter(author=self.user),
+        }
+        for name, queryset in querysets.items():
+            with self.subTest(name=name):
+                plan = self.get_plan(queryset)
+                self.assertNotIn('TEMP B-TREE', plan)
+                self.assertIn('INDEX', plan)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def get_stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_and_comment_counters(self):
+        """Счётчики постов и комментариев следуют за созданием и удалением."""
+        post = Post.objects.create(author=self.user, text='Текст')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.get_stats(self.user).posts_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        post.delete()
+        self.assertEqual(self.get_stats(self.user).posts_count, 0)
+
+    def test_follow_counters(self):
+        follow = Follow.objects.create(user=self.reader, author=self.user)
+        self.assertEqual(self.get_stats(self.user).followers_count, 1)
+        self.assertEqual(self.get_stats(self.reader).following_count, 1)
+        follow.delete()
+        self.assertEqual(self.get_stats(self.user).followers_count, 0)
+        self.assertEqual(self.get_stats(self.reader).following_count, 0)
+
+    def test_reconcile_counters_repairs_drift(self):
+        post = Post.objects.create(author=self.user, text='Текст')
+        Comment.objects.create(post=post, author=self.reader, text='Текст')
+        Follow.objects.create(user=self.reader, author=self.user)
+        UserStats.objects.update(
+            posts_count=7, followers_count=7, following_count=7
+        )
+        Post.objects.update(comments_count=7)
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+        stats = self.get_stats(self.user)
+        self.assertEqual(
+            (stats.posts_count, stats.followers_count, stats.following_count),
+            (1, 1, 0),
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+
+class CountersAtomicityTest(TransactionTestCase):
+    """Без внешней транзакции TestCase, как в запросе."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.reader = User.objects.create_user(username='reader')
+
+    def test_failed_counter_update_rolls_back_write(self):
+        """Если счётчик не обновился, строка тоже не сохраняется."""
+        post = Post.objects.create(author=self.user, text='Текст')
+        cases = (
+            ('change_user_stats',
+             lambda: Post.objects.create(author=self.user, text='Ещё')),
+            ('change_comments_count',
+             lambda: Comment.objects.create(
+                 post=post, author=self.reader, text='Текст')),
+            ('change_user_stats',
+             lambda: Follow.objects.create(
+                 user=self.reader, author=self.user)),
+            ('change_user_stats', post.delete),
+        )
+        for name, write in cases:
+            with self.subTest(write=write):
+                with (
+                    mock.patch(
+                        f'posts.counters.{name}', side_effect=DatabaseError
+                    ),
+                    self.assertRaises(DatabaseError),
+                ):
+                    write()
+        self.assertEqual(list(Post.objects.all()), [post])
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).posts_count, 1
+        )
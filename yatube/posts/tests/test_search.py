@@ -0,0 +1,100 @@
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post, User
+from ..search import search_posts
+
+
+@skipUnless(connection.vendor == 'sqlite', 'FTS5 есть только в SQLite')
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Котики', slug='cats', description='Про котиков'
+        )
+        cls.best = Post.objects.create(
+            text='Котики, котики и ещё раз котики',
+            author=cls.author,
+            group=cls.group,
+        )
+        cls.worse = Post.objects.create(
+            text='Длинный пост о погоде, где однажды упомянуты котики '
+                 'и ещё много других слов про дождь и ветер',
+            author=cls.other,
+        )
+        cls.unrelated = Post.objects.create(
+            text='Про собак', author=cls.author
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def search(self, **params):
+        response = self.guest_client.get(reverse('posts:search'), params)
+        return response, list(response.context['page_obj'])
+
+    def test_results_are_ranked(self):
+        """Посты с более частым совпадением выше в выдаче."""
+        _, posts = self.search(q='котик')
+        self.assertEqual(posts, [self.best, self.worse])
+
+    def test_filters(self):
+        _, posts = self.search(q='котики', group='cats')
+        self.assertEqual(posts, [self.best])
+        _, posts = self.search(q='котики', author='other')
+        self.assertEqual(posts, [self.worse])
+
+    def test_snippet_is_highlighted_and_escaped(self):
+        post = Post.objects.create(
+            text='<script>котики</script>', author=self.author
+        )
+        response, posts = self.search(q='котики', author='author')
+        self.assertIn(post, posts)
+        self.assertContains(
+            response, '&lt;script&gt;<mark>котики</mark>&lt;/script&gt;'
+        )
+
+    def test_index_follows_updates_and_deletes(self):
+        Post.objects.filter(pk=self.unrelated.pk).update(text='Про енотов')
+        self.assertFalse(search_posts('собак').exists())
+        self.assertEqual(list(search_posts('енот')), [self.unrelated])
+        self.unrelated.delete()
+        self.assertFalse(search_posts('енот').exists())
+
+    def test_query_syntax_is_not_passed_to_fts(self):
+        response, posts = self.search(q='котики" OR (NEAR')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(posts, [])
+
+    def test_cursor_pagination_keeps_query(self):
+        for index in range(12):
+            Post.objects.create(text=f'Котики {index}', author=self.other)
+        response, first = self.search(q='котики')
+        page_obj = response.context['page_obj']
+        self.assertTrue(page_obj.has_next())
+        self.assertContains(response, 'q=%D0%BA%D0%BE%D1%82%D0%B8%D0%BA%D0%B8')
+        _, second = self.search(q='котики', cursor=page_obj.next_cursor)
+        self.assertEqual(len(first) + len(second), 14)
+        self.assertFalse(set(first) & set(second))
+
+    def test_rebuild_command(self):
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(search_posts('котики')), 2)
+
+    def test_admin_uses_index(self):
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.guest_client.force_login(admin)
+        response = self.guest_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собак'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.unrelated]
+        )
@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count, F
+from django.test import TestCase
+
+from .. import seed
+from ..models import Comment, Follow, Post, TimelineEntry, User
+
+
+class SeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed.seed(
+            users=30, groups=3, posts=200, follows=150, comments=100,
+            batch_size=50, timeline_users=5,
+        )
+
+    def test_volumes(self):
+        """Создаётся запрошенное число записей."""
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        # Повторные пары подписок отбрасываются ignore_conflicts.
+        self.assertLessEqual(Follow.objects.count(), 150)
+        self.assertFalse(Follow.objects.filter(user=F('author')))
+
+    def test_authors_are_skewed(self):
+        """Самый популярный автор пишет заметно больше среднего."""
+        counts = sorted(
+            Post.objects.values('author').annotate(n=Count('pk'))
+            .values_list('n', flat=True),
+            reverse=True,
+        )
+        self.assertGreater(counts[0], 3 * 200 / 30)
+
+    def test_counters_and_timelines(self):
+        """Счётчики пересчитаны, ленты собраны для первых читателей."""
+        for user in User.objects.select_related('stats'):
+            self.assertEqual(user.stats.posts_count, user.posts.count())
+            self.assertEqual(
+                user.stats.followers_count, user.following.count()
+            )
+        post = Post.objects.filter(comments__isnull=False).first()
+        self.assertEqual(post.comments_count, post.comments.count())
+        readers = TimelineEntry.objects.values('user').distinct().count()
+        self.assertGreater(readers, 0)
+        self.assertLessEqual(readers, 5)
+
+    def test_dates_are_spread(self):
+        """Даты постов не совпадают с моментом генерации."""
+        self.assertGreater(
+            Post.objects.values('pub_date__date').distinct().count(), 30
+        )
+
+    def test_bench_views_writes_json(self):
+        """bench_views проходит все страницы без ошибок и сохраняет JSON."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'bench.json')
+        call_command(
+            'bench_views', requests=2, output=path, stdout=StringIO()
+        )
+        with open(path) as file:
+            result = json.load(file)
+        self.assertEqual(set(result['views']), {
+            'index', 'group_posts', 'profile', 'post_detail',
+            'follow_index', 'add_comment',
+        })
+        for name, metrics in result['views'].items():
+            with self.subTest(name=name):
+                self.assertEqual(metrics['errors'], 0)
+                self.assertGreater(metrics['queries'], 0)
+        stdout = StringIO()
+        call_command(
+            'bench_views', requests=2, compare=path, stdout=stdout
+        )
+        self.assertIn('p50 ', stdout.getvalue())
+
+
+class SingleUserSeedTests(TestCase):
+    def test_single_user_gets_no_follows(self):
+        """С одним пользователем подписки не создаются, seed не зависает."""
+        seed.seed(
+            users=1, groups=1, posts=5, follows=10, comments=5,
+            batch_size=50, timeline_users=1,
+        )
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertFalse(Follow.objects.exists())
@@ -0,0 +1,140 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry, User
+from ..timeline import MergedTimeline, timeline_entries, timeline_page
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            text='Пост до подписки',
+            author=cls.author,
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def get_feed(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_timeline(self):
+        """Подписка добавляет в ленту уже опубликованные посты автора."""
+        self.authorized_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'author'})
+        )
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user, post=self.post).exists())
+        self.assertEqual(self.get_feed(), [self.post])
+
+    def test_new_post_fans_out_to_followers(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user, post=post).exists())
+        self.assertEqual(self.get_feed(), [post, self.post])
+
+    def test_unfollow_trims_timeline(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'author'})
+        )
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+        self.assertEqual(self.get_feed(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_popular_author_is_read_on_demand(self):
+        """Посты популярных авторов не раскладываются, но видны в ленте."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.get_feed(), [post, self.post])
+
+    def test_rebuild_timelines_command(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.get_feed(), [self.post])
+
+
+@override_settings(TIMELINE_FANOUT_LIMIT=1)
+class MergedTimelineTests(TestCase):
+    """Лента из материализованной части и постов популярного автора."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.star = User.objects.create_user(username='star')
+        fan = User.objects.create_user(username='fan')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        Follow.objects.create(user=cls.user, author=cls.star)
+        # Этот пост разложен, пока у звезды был один подписчик.
+        Post.objects.create(text='Ранний пост', author=cls.star)
+        Follow.objects.create(user=fan, author=cls.star)
+        for number in range(5):
+            Post.objects.create(text=f'Пост {number}', author=cls.author)
+            Post.objects.create(text=f'Звезда {number}', author=cls.star)
+        cls.expected = list(Post.objects.filter(
+            author__in=[cls.author, cls.star]
+        ).order_by('-pub_date', '-pk'))
+
+    def get_page(self, per_page=4, cursor_only=False, **params):
+        request = RequestFactory().get('/', params)
+        request.user = self.user
+        return timeline_page(request, per_page, cursor_only)
+
+    def test_pages_merge_both_sources(self):
+        """Посты идут по дате без дублей, номера страниц работают."""
+        self.assertEqual(self.expected[-1].text, 'Ранний пост')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user, post=self.expected[-1]
+        ).exists())
+        pages = [self.get_page(page=number) for number in (1, 2, 3)]
+        self.assertEqual(pages[0].paginator.count, len(self.expected))
+        self.assertEqual(
+            [post for page in pages for post in page], self.expected
+        )
+
+    def test_cursor_walks_forward_and_back(self):
+        seen = []
+        page = self.get_page(cursor_only=True)
+        pages = [page]
+        while True:
+            seen.extend(page)
+            if not page.has_next():
+                break
+            page = self.get_page(cursor_only=True, cursor=page.next_cursor)
+            pages.append(page)
+        self.assertEqual(seen, self.expected)
+        back = self.get_page(cursor_only=True, cursor=page.previous_cursor)
+        self.assertEqual(list(back), list(pages[-2]))
+        self.assertTrue(back.has_next())
+
+    def test_read_path_uses_indexes(self):
+        """Обе части ленты читаются по индексу, без OR и Follow."""
+        merged = MergedTimeline(
+            timeline_entries(self.user).exclude(post__author__in=[self.star]),
+            Post.objects.filter(author__in=[self.star]),
+        )
+        for queryset in (merged.entries[:10], merged.posts[:10]):
+            sql, params = queryset.query.sql_with_params()
+            with self.subTest(sql=sql):
+                self.assertNotIn('posts_follow', sql)
+                self.assertNotIn(' OR ', sql)
+                with connection.cursor() as cursor:
+                    cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                    plan = ' / '.join(row[-1] for row in cursor.fetchall())
+                self.assertIn('INDEX', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
@@ -0,0 +1,138 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from .. import transfer
+from ..models import Comment, Follow, Group, Post, TimelineEntry, User
+
+
+class TransferTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        cls.user = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание'
+        )
+        for i in range(7):
+            post = Post.objects.create(
+                author=cls.user,
+                text=f'Пост {i}',
+                group=cls.group if i % 2 else None,
+            )
+            Comment.objects.create(
+                post=post, author=cls.reader, text=f'Комментарий {i}'
+            )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        self.path = os.path.join(self.directory, f'{self._testMethodName}')
+
+    def snapshot(self):
+        return {
+            'posts': list(Post.objects.order_by('pk').values_list(
+                'pk', 'text', 'pub_date', 'author__username', 'group__slug'
+            )),
+            'comments': list(Comment.objects.order_by('pk').values_list(
+                'pk', 'post_id', 'text', 'created', 'author__username'
+            )),
+            'follows': list(Follow.objects.values_list(
+                'user__username', 'author__username'
+            )),
+            'groups': list(Group.objects.values_list('slug', 'title')),
+        }
+
+    def wipe(self):
+        for model in (Follow, Comment, Post, Group, User):
+            model.objects.all().delete()
+
+    def test_export_import_round_trip(self):
+        """Импорт выгрузки восстанавливает данные, даты и счётчики."""
+        before = self.snapshot()
+        call_command('export_posts', self.path, '--batch-size', '3',
+                     stdout=StringIO(), stderr=StringIO())
+        self.wipe()
+        call_command('import_posts', self.path, '--batch-size', '3',
+                     stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(self.snapshot(), before)
+        author = User.objects.get(username='author')
+        self.assertEqual(author.stats.posts_count, 7)
+        self.assertEqual(author.stats.followers_count, 1)
+        self.assertEqual(Post.objects.filter(comments_count=1).count(), 7)
+        self.assertEqual(TimelineEntry.objects.count(), 7)
+        self.assertFalse(os.path.exists(f'{self.path}.checkpoint'))
+
+    def test_import_resumes_from_checkpoint(self):
+        before = self.snapshot()
+        transfer.export_records(self.path, batch_size=100)
+        self.wipe()
+        flush = transfer._flush
+        calls = []
+
+        def failing_flush(section, records):
+            calls.append(section)
+            if section == 'comment':
+                raise RuntimeError('сбой')
+            flush(section, records)
+
+        with mock.patch.object(transfer, '_flush', failing_flush):
+            with self.assertRaises(RuntimeError):
+                transfer.import_records(self.path, batch_size=2)
+        self.assertFalse(Comment.objects.exists())
+        with mock.patch.object(transfer, '_flush') as patched:
+            patched.side_effect = flush
+            transfer.import_records(self.path, batch_size=2, resume=True)
+        sections = [call.args[0] for call in patched.call_args_list]
+        self.assertNotIn('post', sections)
+        self.assertEqual(self.snapshot(), before)
+
+    def test_export_resumes_from_checkpoint(self):
+        full_path = f'{self.path}.full'
+        transfer.export_records(full_path, batch_size=2)
+        with mock.patch.object(
+            transfer.Checkpoint, 'clear', side_effect=RuntimeError
+        ):
+            with self.assertRaises(RuntimeError):
+                transfer.export_records(self.path, batch_size=2)
+        # Оборванный хвост после контрольной точки перезаписывается.
+        with open(self.path, 'ab') as file:
+            file.write(b'{"type": "post", "id"')
+        transfer.export_records(self.path, batch_size=2, resume=True)
+        with open(self.path, 'rb') as file, open(full_path, 'rb') as full:
+            self.assertEqual(file.read(), full.read())
+
+    def test_unknown_author(self):
+        with open(self.path, 'w') as file:
+            file.write(
+                '{"type": "post", "id": 100, "text": "x", '
+                '"pub_date": "2022-01-01T00:00:00+00:00", '
+                '"updated_at": "2022-01-01T00:00:00+00:00", "image": "", '
+                '"author": "ghost", "group": null}\n'
+            )
+        with self.assertRaisesMessage(ValueError, 'ghost'):
+            transfer.import_records(self.path, batch_size=10)
+
+    def test_import_into_database_with_posts(self):
+        """Чужой пост с тем же id останавливает импорт, а не теряется."""
+        transfer.export_records(self.path, batch_size=100)
+        pk = Post.objects.earliest('pk').pk
+        Comment.objects.all().delete()
+        Post.objects.filter(pk=pk).delete()
+        Post.objects.create(id=pk, author=self.reader, text='Другой пост')
+        with self.assertRaisesMessage(CommandError, f'id {pk}'):
+            call_command('import_posts', self.path,
+                         stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(Post.objects.get(pk=pk).text, 'Другой пост')
+        self.assertFalse(Comment.objects.exists())
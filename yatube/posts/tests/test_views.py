@@ -1,15 +1,20 @@
 import shutil
 import tempfile
+from datetime import timedelta
+from unittest import mock
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django import forms
 
-from ..models import Post, Group, User, Follow
-from ..views import NUM_OF_P
+from ..models import Comment, Post, Group, User, Follow, UserStats
+from ..utils import FeedPaginator
+from ..views import COMMENTS_PER_PAGE, NUM_OF_P
 
 COUNT_POSTS = 13
 
@@ -229,6 +234,111 @@ class PaginatorViewsTest(TestCase):
             len(response.context['page_obj']), COUNT_POSTS - NUM_OF_P
         )
 
+    def test_cursor_pages_follow_each_other(self):
+        """Курсоры ведут на следующую и обратно на предыдущую страницу."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first_page = self.client.get(url).context['page_obj']
+                response = self.client.get(
+                    url, {'cursor': first_page.next_cursor}
+                )
+                second_page = response.context['page_obj']
+                self.assertEqual(len(second_page), COUNT_POSTS - NUM_OF_P)
+                self.assertFalse(second_page.has_next())
+                self.assertTrue(second_page.has_previous())
+                response = self.client.get(
+                    url, {'cursor': second_page.previous_cursor}
+                )
+                self.assertEqual(
+                    list(response.context['page_obj']), list(first_page)
+                )
+                self.assertFalse(response.context['page_obj'].has_previous())
+
+    def test_cursor_page_matches_numbered_page(self):
+        first_page = self.client.get(
+            reverse('posts:index')
+        ).context['page_obj']
+        by_cursor = self.client.get(
+            reverse('posts:index'), {'cursor': first_page.next_cursor}
+        ).context['page_obj']
+        by_number = self.client.get(
+            reverse('posts:index'), {'page': 2}
+        ).context['page_obj']
+        self.assertEqual(list(by_cursor), list(by_number))
+
+    def test_invalid_cursor_returns_first_page(self):
+        response = self.client.get(
+            reverse('posts:index'), {'cursor': 'не-курсор'}
+        )
+        self.assertEqual(len(response.context['page_obj']), NUM_OF_P)
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+
+class FeedPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        for i in range(COUNT_POSTS):
+            Post.objects.create(author=cls.user, text=f'{i} тестовый текст')
+
+    def setUp(self):
+        cache.clear()
+
+    def paginator(self):
+        return FeedPaginator(Post.objects.order_by('-pk'), NUM_OF_P)
+
+    def test_short_feed_is_counted_exactly(self):
+        paginator = self.paginator()
+        self.assertEqual(paginator.count, COUNT_POSTS)
+        self.assertFalse(paginator.count_is_approximate)
+        Post.objects.create(author=self.user, text='Новый пост')
+        self.assertEqual(self.paginator().count, COUNT_POSTS + 1)
+
+    @mock.patch('posts.utils.EXACT_COUNT_LIMIT', 5)
+    def test_long_feed_count_is_cached(self):
+        """Длинная лента считается раз в TTL, count приблизителен."""
+        paginator = self.paginator()
+        self.assertEqual(paginator.count, COUNT_POSTS)
+        self.assertTrue(paginator.count_is_approximate)
+        Post.objects.create(author=self.user, text='Новый пост')
+        with self.assertNumQueries(0):
+            paginator = self.paginator()
+            self.assertEqual(paginator.count, COUNT_POSTS)
+        self.assertTrue(paginator.count_is_approximate)
+        cache.clear()
+        self.assertEqual(self.paginator().count, COUNT_POSTS + 1)
+
+    def test_profile_uses_posts_counter(self):
+        """Профиль берёт число постов из UserStats, без COUNT."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('posts:profile', args=[self.user.username])
+            )
+        self.assertEqual(
+            response.context['page_obj'].paginator.count, COUNT_POSTS
+        )
+        self.assertFalse(any(
+            'COUNT(' in query['sql'] for query in queries.captured_queries
+        ))
+
+    def test_stale_counter_does_not_hide_posts(self):
+        """Отставший счётчик влияет на номера страниц, но не на посты."""
+        UserStats.objects.filter(user=self.user).update(posts_count=3)
+        url = reverse('posts:profile', args=[self.user.username])
+        page_obj = self.client.get(url).context['page_obj']
+        self.assertEqual(len(page_obj), NUM_OF_P)
+        self.assertTrue(page_obj.has_next())
+        page_obj = self.client.get(
+            url, {'cursor': page_obj.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(len(page_obj), COUNT_POSTS - NUM_OF_P)
+        self.assertFalse(page_obj.has_next())
+
 
 class CashViewTests(TestCase):
 
@@ -250,7 +360,8 @@ class CashViewTests(TestCase):
     def test_cash_page(self):
         """Проверяем кэш на главной странице."""
         response = self.authorized_client.get(reverse('posts:index')).content
-        self.post.delete()
+        # update() не отправляет сигналов, поэтому поколение не меняется.
+        Post.objects.filter(pk=self.post.pk).update(text='Другой текст')
         self.assertEqual(
             response, self.authorized_client.get(
                 reverse('posts:index')).content
@@ -261,6 +372,30 @@ class CashViewTests(TestCase):
                 reverse('posts:index')).content
         )
 
+    def test_cache_invalidated_on_change(self):
+        """Изменения постов сразу видны во всех закэшированных лентах."""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.user)
+        self.authorized_client.force_login(reader)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+        self.post.text = 'Отредактированный пост'
+        self.post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'Отредактированный пост')
+        self.post.delete()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertNotContains(response, 'Отредактированный пост')
+
 
 class FollowPagesTests(TestCase):
 
@@ -337,3 +472,198 @@ class FollowPagesTests(TestCase):
                     reverse_name, follow=True
                 )
                 self.assertTemplateUsed(response, template)
+
+
+class QueryCountTests(TestCase):
+    """Число запросов страницы не зависит от числа постов и комментариев."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Тестовое описание',
+            slug='test-slug',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(url)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        before = {url: self.count_queries(url) for url in self.urls}
+        for i in range(NUM_OF_P):
+            author = User.objects.create_user(
+                username=f'user_{i}', first_name='Имя', last_name='Фамилия'
+            )
+            Follow.objects.create(user=self.reader, author=author)
+            Post.objects.create(author=author, text=f'{i}', group=self.group)
+            Post.objects.create(author=self.user, text=f'{i}')
+            Comment.objects.create(
+                post=self.post, author=author, text='Комментарий'
+            )
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), before[url])
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Тестовое описание',
+            slug='test-slug',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+        # ETag выдаётся только с общим кэшем поколений.
+        patcher = mock.patch(
+            'posts.conditional.is_shared', return_value=True
+        )
+        self.is_shared = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_matching_etag_returns_not_modified(self):
+        """Совпавший ETag даёт 304, а правка поста — новую страницу."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        self.post.text = 'Отредактированный пост'
+        self.post.save()
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_differs_between_users(self):
+        url = reverse('posts:index')
+        guest_etag = self.client.get(url)['ETag']
+        self.client.force_login(self.user)
+        self.assertNotEqual(self.client.get(url)['ETag'], guest_etag)
+
+    def test_no_etag_without_shared_cache(self):
+        """С кэшем в памяти процесса ETag не выдаётся и 304 не бывает."""
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        self.is_shared.return_value = False
+        self.assertNotIn('ETag', self.client.get(url))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_post_detail_last_modified(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_follow_changes_profile_etag(self):
+        """После подписки профиль не отдаётся из кэша браузера."""
+        reader = User.objects.create_user(username='reader')
+        self.client.force_login(reader)
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        etag = self.client.get(url)['ETag']
+        self.client.get(
+            reverse('posts:profile_follow', kwargs={'username': self.user})
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['following'])
+
+    def test_comment_delete_advances_last_modified(self):
+        """Удаление комментария сдвигает Last-Modified поста вперёд."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        last_modified = self.client.get(url)['Last-Modified']
+        with mock.patch('django.utils.timezone.now') as now:
+            now.return_value = comment.created + timedelta(seconds=5)
+            comment.delete()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+
+
+class CommentsPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Комментарий {i}')
+            for i in range(COMMENTS_PER_PAGE + 5)
+        )
+        cls.comments = list(cls.post.comments.order_by('created', 'pk'))
+
+    def test_first_page_is_inlined(self):
+        """На странице поста только первая страница комментариев."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        comments = self.client.get(url).context['comments']
+        self.assertEqual(list(comments), self.comments[:COMMENTS_PER_PAGE])
+        self.assertTrue(comments.has_next())
+        response = self.client.get(url, {'order': 'new'})
+        self.assertEqual(
+            list(response.context['comments']),
+            self.comments[::-1][:COMMENTS_PER_PAGE],
+        )
+
+    def test_fragment_returns_next_page(self):
+        detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+        cursor = self.client.get(detail_url).context['comments'].next_cursor
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk}),
+            {'cursor': cursor},
+        )
+        self.assertTemplateUsed(response, 'includes/comments.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertEqual(
+            list(response.context['comments']),
+            self.comments[COMMENTS_PER_PAGE:],
+        )
+        self.assertNotContains(response, 'js-more-comments')
+
+    def test_fragment_for_missing_post(self):
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 999})
+        )
+        self.assertEqual(response.status_code, 404)
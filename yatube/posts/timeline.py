@@ -0,0 +1,213 @@
+"""Материализованная лента подписок (fan-out-on-write).
+
+Новый пост раскладывается по лентам подписчиков автора в момент
+публикации, поэтому чтение ленты — это выборка по индексу
+(user, pub_date). Для авторов с очень большим числом подписчиков
+раскладка слишком дорога: их посты подмешиваются при чтении.
+"""
+import heapq
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import transaction
+
+from .models import Follow, Post, TimelineEntry, UserStats
+from .utils import (
+    CURSOR_PREVIOUS, FEED_ORDERING, CursorPage, CursorPaginator,
+    _add_next_cursor, apaginate, cursor_paginate, decode_cursor, paginate,
+)
+
+TIMELINE_ORDERING = ('-pub_date', '-post_id')
+
+
+def generation_name(user_id):
+    """Имя поколения кэша для ленты подписок пользователя."""
+    return f'timeline:{user_id}'
+
+
+def is_fanout_author(author_id):
+    """Раскладываются ли посты автора по лентам при публикации."""
+    return not UserStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).exists()
+
+
+def read_time_authors(user):
+    """Авторы из подписок пользователя, чьи посты читаются напрямую."""
+    return Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).values('author')
+
+
+def _bulk_add(entries):
+    TimelineEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out(post):
+    """Добавляет пост в ленты всех подписчиков автора."""
+    if not is_fanout_author(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _bulk_add(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_id):
+    """Заполняет ленту последними постами нового автора из подписок."""
+    if not is_fanout_author(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-pk'
+    ).values_list('pk', 'pub_date')[:settings.TIMELINE_BACKFILL_SIZE]
+    _bulk_add(
+        TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts
+    )
+
+
+def trim(user_id, author_id):
+    """Убирает из ленты посты автора, от которого отписались."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+@transaction.atomic
+def rebuild(user_id):
+    """Пересобирает ленту пользователя по его текущим подпискам."""
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    authors = Follow.objects.filter(
+        user_id=user_id
+    ).values_list('author_id', flat=True)
+    for author_id in authors:
+        backfill(user_id, author_id)
+
+
+def timeline_entries(user):
+    """Материализованная часть ленты: выборка по индексу (user, pub_date)."""
+    return TimelineEntry.objects.filter(user=user).select_related(
+        'post__author', 'post__group'
+    )
+
+
+def _newest_first(*posts):
+    """Сливает списки постов, упорядоченные по (pub_date, pk) по убыванию."""
+    return list(heapq.merge(
+        *posts, key=lambda post: (post.pub_date, post.pk), reverse=True
+    ))
+
+
+class MergedTimeline:
+    """Лента для Paginator: материализованная часть и посты авторов
+    с раскладкой при чтении.
+
+    Срез [a:b] читает первые b строк каждого источника по его индексу
+    и сливает их в памяти — без OR и соединения с Follow.
+    """
+
+    def __init__(self, entries, posts):
+        self.entries = entries.order_by(*TIMELINE_ORDERING)
+        self.posts = posts.order_by(*FEED_ORDERING)
+
+    def count(self):
+        return self.entries.count() + self.posts.count()
+
+    def __getitem__(self, index):
+        merged = _newest_first(
+            [entry.post for entry in self.entries[:index.stop]],
+            list(self.posts[:index.stop]),
+        )
+        return merged[index]
+
+
+def _merged_cursor_page(cursor, entries, posts, per_page):
+    """Страница по курсору из обоих источников.
+
+    Курсор — значения (pub_date, id), общие для записи ленты и поста,
+    поэтому один токен сдвигает оба источника.
+    """
+    entry_pages = CursorPaginator(entries, per_page, TIMELINE_ORDERING)
+    post_pages = CursorPaginator(posts, per_page, FEED_ORDERING)
+    entry_page = entry_pages.get_page(cursor)
+    post_page = post_pages.get_page(cursor)
+    items = _newest_first([entry.post for entry in entry_page], post_page)
+    more = len(items) > per_page
+    if entry_pages.cursor is None:
+        return CursorPage(
+            items[:per_page], post_pages,
+            more or entry_page.has_next() or post_page.has_next(), False,
+        )
+    direction, _ = decode_cursor(entry_pages.cursor)
+    if direction == CURSOR_PREVIOUS:
+        return CursorPage(
+            items[-per_page:], post_pages, True,
+            more or entry_page.has_previous() or post_page.has_previous(),
+        )
+    return CursorPage(
+        items[:per_page], post_pages,
+        more or entry_page.has_next() or post_page.has_next(), True,
+    )
+
+
+def _merged_page(request, user, authors, per_page, cursor_only=False):
+    """Страница ленты с авторами, чьи посты читаются напрямую."""
+    # Записи, разложенные до того, как автор стал популярным, уже
+    # придут из его постов.
+    entries = timeline_entries(user).exclude(post__author__in=authors)
+    posts = Post.objects.filter(author__in=authors).with_related()
+    cursor = request.GET.get('cursor')
+    if cursor or cursor_only:
+        return _merged_cursor_page(cursor, entries, posts, per_page)
+    paginator = Paginator(MergedTimeline(entries, posts), per_page)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    return _add_next_cursor(page_obj, posts, per_page, FEED_ORDERING)
+
+
+def timeline_page(request, per_page, cursor_only=False):
+    """Страница ленты подписок текущего пользователя.
+
+    Страница читается из TimelineEntry по индексу (user, pub_date,
+    post_id). Посты авторов с раскладкой при чтении выбираются отдельно
+    по индексу (author, pub_date) и сливаются с ней в памяти.
+    cursor_only — только пагинация по ключу, без COUNT(*), для API.
+    """
+    user = request.user
+    authors = list(read_time_authors(user).values_list('author', flat=True))
+    if authors:
+        return _merged_page(request, user, authors, per_page, cursor_only)
+    paginator = cursor_paginate if cursor_only else paginate
+    page_obj = paginator(
+        request, timeline_entries(user), per_page, TIMELINE_ORDERING
+    )
+    page_obj.object_list = [entry.post for entry in page_obj]
+    return page_obj
+
+
+async def atimeline_page(request, per_page):
+    """timeline_page() для асинхронных представлений."""
+    user = await request.auser()
+    authors = [
+        author async for author in read_time_authors(user).values_list(
+            'author', flat=True
+        )
+    ]
+    if authors:
+        return await sync_to_async(_merged_page)(
+            request, user, authors, per_page
+        )
+    page_obj = await apaginate(
+        request, timeline_entries(user), per_page, TIMELINE_ORDERING
+    )
+    page_obj.object_list = [entry.post for entry in page_obj]
+    return page_obj
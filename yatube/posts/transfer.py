@@ -0,0 +1,292 @@
+"""Потоковый экспорт и импорт данных posts в формате JSONL.
+
+Каждая строка файла — одна запись с полем "type": group, user, post,
+comment или follow, в этом порядке, чтобы при импорте связи уже
+существовали. На пользователей и группы записи ссылаются по username
+и slug, посты и комментарии сохраняют свои id. Поэтому импорт рассчитан
+на пустую базу: если id поста или комментария уже занят другой
+записью, импорт останавливается с ошибкой.
+
+Экспорт читает таблицы через iterator(), импорт пишет bulk_create
+пачками; в памяти держится только текущая пачка. После каждой пачки
+в файл контрольной точки записывается позиция, с которой можно
+продолжить прерванную операцию.
+"""
+import datetime
+import json
+import os
+from contextlib import contextmanager
+
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Follow, Group, Post, User
+
+SECTIONS = {
+    'group': (
+        Group.objects.all(),
+        ('slug', 'title', 'description'),
+    ),
+    'user': (
+        User.objects.all(),
+        ('username', 'first_name', 'last_name', 'email', 'password',
+         'is_active', 'date_joined'),
+    ),
+    'post': (
+        Post.objects.all(),
+        ('id', 'text', 'pub_date', 'updated_at', 'image',
+         'author__username', 'group__slug'),
+    ),
+    'comment': (
+        Comment.objects.all(),
+        ('id', 'post_id', 'text', 'created', 'author__username'),
+    ),
+    'follow': (
+        Follow.objects.all(),
+        ('user__username', 'author__username'),
+    ),
+}
+
+# Имена полей в файле: связи пишутся без суффиксов ORM.
+RENAMES = {
+    'author__username': 'author',
+    'group__slug': 'group',
+    'post_id': 'post',
+    'user__username': 'user',
+}
+
+DATE_FIELDS = ('date_joined', 'pub_date', 'updated_at', 'created')
+
+# Поля, по которым строка в базе признаётся той же записью из файла.
+IDENTITY_FIELDS = {
+    'post': ('author_id', 'pub_date', 'text'),
+    'comment': ('post_id', 'author_id', 'created', 'text'),
+}
+
+
+class Encoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder отбрасывает микросекунды, а они нужны, чтобы
+        # порядок лент после импорта не изменился.
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class Checkpoint:
+    """Позиция в файле и состояние операции в соседнем .checkpoint."""
+
+    def __init__(self, path):
+        self.path = f'{path}.checkpoint'
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as file:
+            return json.load(file)
+
+    def save(self, **state):
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w') as file:
+            json.dump(state, file)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def export_records(path, batch_size, resume=False, progress=None):
+    """Выгружает все разделы в JSONL; возвращает число записей."""
+    checkpoint = Checkpoint(path)
+    state = checkpoint.load() if resume else None
+    mode = 'r+b' if state else 'wb'
+    written = 0
+    with open(path, mode) as file:
+        if state:
+            file.truncate(state['offset'])
+            file.seek(state['offset'])
+            written = state['written']
+        sections = list(SECTIONS)
+        start = sections.index(state['section']) if state else 0
+        for section in sections[start:]:
+            queryset, fields = SECTIONS[section]
+            queryset = queryset.order_by('pk')
+            if state and section == state['section']:
+                queryset = queryset.filter(pk__gt=state['pk'])
+            rows = queryset.values_list('pk', *fields).iterator(
+                chunk_size=batch_size
+            )
+            last_pk = None
+            for count, (pk, *values) in enumerate(rows, 1):
+                record = {'type': section}
+                for field, value in zip(fields, values):
+                    record[RENAMES.get(field, field)] = value
+                file.write(json.dumps(
+                    record, cls=Encoder, ensure_ascii=False
+                ).encode() + b'\n')
+                written += 1
+                last_pk = pk
+                if count % batch_size == 0:
+                    file.flush()
+                    checkpoint.save(
+                        section=section, pk=pk,
+                        offset=file.tell(), written=written,
+                    )
+                    if progress:
+                        progress(section, written)
+            if progress and last_pk is not None:
+                progress(section, written)
+    checkpoint.clear()
+    return written
+
+
+@contextmanager
+def original_dates():
+    """Отключает auto_now/auto_now_add, чтобы сохранить даты из файла."""
+    fields = [
+        field
+        for model in (Post, Comment)
+        for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _ids(model, field, values):
+    return dict(
+        model.objects.filter(**{f'{field}__in': set(values)})
+        .values_list(field, 'pk')
+    )
+
+
+def _parse_dates(record):
+    for field in DATE_FIELDS:
+        if record.get(field):
+            record[field] = parse_datetime(record[field])
+    return record
+
+
+def _resolve(mapping, key, kind):
+    if key not in mapping:
+        raise ValueError(f'{kind} {key!r} не найден в базе')
+    return mapping[key]
+
+
+def _build(section, records):
+    """Объекты модели для пачки записей одного раздела."""
+    if section == 'group':
+        return [Group(**record) for record in records]
+    if section == 'user':
+        return [User(**record) for record in records]
+    users = _ids(User, 'username', (
+        name for record in records
+        for name in (record.get('author'), record.get('user')) if name
+    ))
+    groups = {}
+    if section == 'post':
+        groups = _ids(Group, 'slug', (
+            record['group'] for record in records if record['group']
+        ))
+    model = {'post': Post, 'comment': Comment, 'follow': Follow}[section]
+    objects = []
+    for record in records:
+        for field in ('author', 'user'):
+            if field in record:
+                record[f'{field}_id'] = _resolve(
+                    users, record.pop(field), 'Пользователь'
+                )
+        if 'group' in record:
+            slug = record.pop('group')
+            record['group_id'] = slug and _resolve(groups, slug, 'Группа')
+        if 'post' in record:
+            record['post_id'] = record.pop('post')
+        objects.append(model(**record))
+    return objects
+
+
+def _new_objects(section, objects):
+    """Объекты пачки, которых ещё нет в базе.
+
+    Строки, уже записанные этим же импортом до сбоя, пропускаются.
+    Чужая строка с тем же id — ошибка: её нельзя ни перезаписать, ни
+    молча потерять запись из файла.
+    """
+    model = type(objects[0])
+    existing = model.objects.in_bulk([obj.pk for obj in objects])
+    fields = IDENTITY_FIELDS[section]
+    new = []
+    for obj in objects:
+        current = existing.get(obj.pk)
+        if current is None:
+            new.append(obj)
+        elif any(
+            getattr(current, field) != getattr(obj, field)
+            for field in fields
+        ):
+            raise ValueError(
+                f'{section} с id {obj.pk} уже есть в базе и не совпадает '
+                f'с записью в файле; загружайте данные в пустую базу'
+            )
+    return new
+
+
+def _flush(section, records):
+    objects = _build(section, [_parse_dates(record) for record in records])
+    model = type(objects[0])
+    with transaction.atomic():
+        # Повторный импорт той же пачки после сбоя ничего не дублирует.
+        if section in IDENTITY_FIELDS:
+            model.objects.bulk_create(_new_objects(section, objects))
+        else:
+            model.objects.bulk_create(objects, ignore_conflicts=True)
+
+
+def import_records(path, batch_size, resume=False, progress=None):
+    """Загружает JSONL в базу; возвращает число прочитанных записей."""
+    checkpoint = Checkpoint(path)
+    state = checkpoint.load() if resume else None
+    read = state['read'] if state else 0
+    section, batch = None, []
+    with original_dates(), open(path, 'rb') as file:
+        if state:
+            file.seek(state['offset'])
+        while True:
+            line = file.readline()
+            record = json.loads(line) if line.strip() else None
+            kind = record.pop('type') if record else None
+            if batch and (kind != section or len(batch) >= batch_size):
+                _flush(section, batch)
+                read += len(batch)
+                # Позиция — начало текущей строки: она ещё не записана.
+                checkpoint.save(offset=file.tell() - len(line), read=read)
+                if progress:
+                    progress(section, read)
+                batch = []
+            if not line:
+                break
+            if record:
+                section = kind
+                batch.append(record)
+    _reset_sequences()
+    checkpoint.clear()
+    return read
+
+
+def _reset_sequences():
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [Group, User, Post, Comment, Follow]
+    )
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
@@ -0,0 +1,359 @@
+import base64
+import binascii
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+FEED_ORDERING = ('-pub_date', '-pk')
+
+COMMENT_ORDERINGS = {
+    'old': ('created', 'pk'),
+    'new': ('-created', '-pk'),
+}
+
+# Ленты не длиннее стольких записей считаются точно: COUNT по LIMIT
+# такого размера дёшев.
+EXACT_COUNT_LIMIT = 1000
+
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(direction, values):
+    """Упаковывает направление и значения полей сортировки в токен."""
+    raw = '|'.join([direction] + [value_to_str(value) for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен курсора в направление и строковые значения."""
+    padding = '=' * (-len(token) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(token + padding).decode()
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(token)
+    direction, *values = raw.split('|')
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS):
+        raise InvalidCursor(token)
+    return direction, values
+
+
+def value_to_str(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class CursorPage(Page):
+    """Страница, полученная поиском по ключу сортировки, без OFFSET."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+        # Курсоры считаются сразу: object_list потом можно подменить,
+        # например, постами вместо записей ленты.
+        self.next_cursor = None
+        self.previous_cursor = None
+        if has_next and object_list:
+            self.next_cursor = paginator.cursor_for(
+                CURSOR_NEXT, object_list[-1]
+            )
+        if has_previous and object_list:
+            self.previous_cursor = paginator.cursor_for(
+                CURSOR_PREVIOUS, object_list[0]
+            )
+
+    def __repr__(self):
+        return '<CursorPage %s>' % self.paginator.cursor
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+
+class CursorPaginator:
+    """Пагинация «по ключу»: WHERE (pub_date, id) < (...) LIMIT n.
+
+    В отличие от Paginator не выполняет COUNT(*) и OFFSET, поэтому
+    стоимость запроса не зависит от глубины страницы.
+    """
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = ordering
+        self.cursor = None
+
+    @property
+    def fields(self):
+        return [name.lstrip('-') for name in self.ordering]
+
+    def cursor_for(self, direction, obj):
+        return encode_cursor(
+            direction, [getattr(obj, field) for field in self.fields]
+        )
+
+    def _parse_values(self, values):
+        if len(values) != len(self.fields):
+            raise InvalidCursor(self.cursor)
+        opts = self.object_list.model._meta
+        annotations = self.object_list.query.annotations
+        parsed = []
+        for field, value in zip(self.fields, values):
+            if field in annotations:
+                model_field = annotations[field].output_field
+            elif field == 'pk':
+                model_field = opts.pk
+            else:
+                model_field = opts.get_field(field)
+            try:
+                if model_field.get_internal_type() == 'DateTimeField':
+                    value = parse_datetime(value)
+                else:
+                    value = model_field.to_python(value)
+            except (ValueError, ValidationError):
+                raise InvalidCursor(self.cursor)
+            if value is None:
+                raise InvalidCursor(self.cursor)
+            parsed.append(value)
+        return parsed
+
+    def _seek(self, values, forward):
+        """Условие «строго после значений курсора» для составного ключа."""
+        condition = Q()
+        for index, field in enumerate(self.fields):
+            descending = self.ordering[index].startswith('-')
+            if descending == forward:
+                lookup = f'{field}__lt'
+            else:
+                lookup = f'{field}__gt'
+            step = Q(**{lookup: values[index]})
+            for previous, value in zip(self.fields[:index], values):
+                step &= Q(**{previous: value})
+            condition |= step
+        return condition
+
+    def _reversed_ordering(self):
+        return [
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        ]
+
+    def get_page(self, cursor=None):
+        """Возвращает страницу по курсору, а при ошибке — первую."""
+        self.cursor = cursor
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            self.cursor = None
+            return self.page(None)
+
+    async def aget_page(self, cursor=None):
+        """get_page() для асинхронных представлений."""
+        self.cursor = cursor
+        try:
+            return await self.apage(cursor)
+        except InvalidCursor:
+            self.cursor = None
+            return await self.apage(None)
+
+    def _query(self, cursor):
+        """Запрос страницы (с лишней строкой) и направление перехода."""
+        limit = self.per_page + 1
+        if not cursor:
+            return self.object_list.order_by(*self.ordering)[:limit], None
+        direction, values = decode_cursor(cursor)
+        values = self._parse_values(values)
+        forward = direction == CURSOR_NEXT
+        queryset = self.object_list.filter(self._seek(values, forward))
+        if forward:
+            return queryset.order_by(*self.ordering)[:limit], True
+        return queryset.order_by(*self._reversed_ordering())[:limit], False
+
+    def _make_page(self, items, forward):
+        more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if forward is None:
+            return CursorPage(items, self, more, False)
+        if forward:
+            return CursorPage(items, self, more, True)
+        return CursorPage(items[::-1], self, True, more)
+
+    def page(self, cursor):
+        queryset, forward = self._query(cursor)
+        return self._make_page(list(queryset), forward)
+
+    async def apage(self, cursor):
+        queryset, forward = self._query(cursor)
+        return self._make_page([obj async for obj in queryset], forward)
+
+
+class FeedPaginator(Paginator):
+    """Paginator без COUNT(*) по всей таблице на каждый запрос.
+
+    Число записей берётся из поддерживаемого счётчика, если он передан
+    (count=...). Иначе ленту считают с LIMIT EXACT_COUNT_LIMIT + 1:
+    короткие ленты получают точное число, а для длинных полный COUNT
+    выполняется раз в FEED_COUNT_TIMEOUT секунд и берётся из кэша.
+    Тогда count приблизителен (count_is_approximate): новые посты
+    появятся в нём после истечения TTL.
+
+    count нужен только для номеров страниц. Страница читается с одной
+    лишней строкой, и по ней, а не по count, решается, есть ли
+    следующая: отставший счётчик не обрезает ленту.
+    """
+
+    count_is_approximate = False
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            self.count = count
+
+    def _cache_key(self):
+        query = str(self.object_list.query).encode()
+        digest = hashlib.md5(query, usedforsecurity=False).hexdigest()
+        return f'feed_count:{digest}'
+
+    def _bounded(self):
+        # Порядок для подсчёта не нужен, а без него SQLite читает индекс.
+        return self.object_list.order_by().values('pk')[:EXACT_COUNT_LIMIT + 1]
+
+    def _cached_count(self):
+        count = cache.get(self._cache_key())
+        if count is not None:
+            self.count_is_approximate = True
+        return count
+
+    def _large_count(self, count):
+        self.count_is_approximate = True
+        cache.set(self._cache_key(), count, settings.FEED_COUNT_TIMEOUT)
+        return count
+
+    @cached_property
+    def count(self):
+        if self.object_list.query.is_empty():
+            return 0
+        cached = self._cached_count()
+        if cached is not None:
+            return cached
+        bounded = self._bounded().count()
+        if bounded <= EXACT_COUNT_LIMIT:
+            return bounded
+        return self._large_count(self.object_list.count())
+
+    async def acount(self):
+        """count на асинхронном ORM."""
+        if 'count' in self.__dict__ or self.object_list.query.is_empty():
+            return self.count
+        count = self._cached_count()
+        if count is None:
+            count = await self._bounded().acount()
+            if count > EXACT_COUNT_LIMIT:
+                count = self._large_count(await self.object_list.acount())
+        self.count = count
+        return count
+
+    def _slice(self, number):
+        bottom = (number - 1) * self.per_page
+        return self.object_list[bottom:bottom + self.per_page + 1]
+
+    def _make_page(self, items, number):
+        # Прочитанные строки уточняют count: лишняя строка доказывает,
+        # что следующая страница есть, а неполная страница — последняя.
+        bottom = (number - 1) * self.per_page
+        if len(items) > self.per_page:
+            self.count = max(self.count, bottom + len(items))
+        elif items:
+            self.count = bottom + len(items)
+        for name in ('num_pages', 'page_range'):
+            self.__dict__.pop(name, None)
+        return Page(items[:self.per_page], number, self)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        return self._make_page(list(self._slice(number)), number)
+
+    async def apage(self, number):
+        number = self.validate_number(number)
+        return self._make_page(
+            [obj async for obj in self._slice(number)], number
+        )
+
+    async def aget_page(self, number):
+        """get_page() на асинхронном ORM; count должен быть посчитан."""
+        try:
+            number = self.validate_number(number)
+        except PageNotAnInteger:
+            number = 1
+        except EmptyPage:
+            number = self.num_pages
+        return await self.apage(number)
+
+
+def _add_next_cursor(page_obj, queryset, per_page, ordering):
+    cursors = CursorPaginator(queryset, per_page, ordering)
+    page_obj.next_cursor = None
+    if page_obj.has_next() and len(page_obj):
+        page_obj.next_cursor = cursors.cursor_for(CURSOR_NEXT, page_obj[-1])
+    return page_obj
+
+
+def paginate(request, queryset, per_page, ordering=FEED_ORDERING,
+             count=None):
+    """Страница ленты для запроса.
+
+    Параметр ?cursor= включает пагинацию по ключу; старые ссылки вида
+    ?page=N продолжают работать через FeedPaginator. count — число
+    записей из поддерживаемого счётчика, если он есть.
+    """
+    cursor = request.GET.get('cursor')
+    if cursor:
+        return CursorPaginator(queryset, per_page, ordering).get_page(cursor)
+    paginator = FeedPaginator(queryset.order_by(*ordering), per_page, count)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    return _add_next_cursor(page_obj, queryset, per_page, ordering)
+
+
+def cursor_paginate(request, queryset, per_page, ordering=FEED_ORDERING):
+    """Только пагинация по ключу, без COUNT(*) — для API."""
+    return CursorPaginator(queryset, per_page, ordering).get_page(
+        request.GET.get('cursor')
+    )
+
+
+def comments_paginator(request, comments, per_page):
+    """Курсорный пагинатор комментариев в порядке из ?order=new|old."""
+    ordering = COMMENT_ORDERINGS.get(
+        request.GET.get('order'), COMMENT_ORDERINGS['old']
+    )
+    return CursorPaginator(comments, per_page, ordering)
+
+
+async def apaginate(request, queryset, per_page, ordering=FEED_ORDERING,
+                    count=None):
+    """paginate() на асинхронном ORM: COUNT и выборка страницы — await."""
+    cursor = request.GET.get('cursor')
+    if cursor:
+        return await CursorPaginator(
+            queryset, per_page, ordering
+        ).aget_page(cursor)
+    paginator = FeedPaginator(queryset.order_by(*ordering), per_page, count)
+    await paginator.acount()
+    page_obj = await paginator.aget_page(request.GET.get('page'))
+    return _add_next_cursor(page_obj, queryset, per_page, ordering)
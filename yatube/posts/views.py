@@ -1,19 +1,27 @@
-from django.core.paginator import Paginator
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from .forms import PostForm, CommentForm
+from django.views.decorators.http import condition
+from core import thumbnails
+from core.cache import get_generation
+from .conditional import feed_etag, post_last_modified
+from .counters import get_user_stats
+from .forms import PostForm, CommentForm, SearchForm
 from .models import Post, Group, User, Follow
+from .search import SEARCH_ORDERING, highlight, search_posts
+from .timeline import generation_name, timeline_page
+from .utils import CursorPaginator, comments_paginator, paginate
 
 
 NUM_OF_P = 10
 
+COMMENTS_PER_PAGE = 20
 
+
+@condition(etag_func=feed_etag)
 def index(request):
     title = 'Последние обновления на сайте'
-    posts = Post.objects.all().order_by('-pub_date')
-    paginator = Paginator(posts, NUM_OF_P)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = Post.objects.with_related()
+    page_obj = paginate(request, posts, NUM_OF_P)
     context = {
         'title': title,
         'page_obj': page_obj,
@@ -21,12 +29,11 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@condition(etag_func=feed_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all().order_by('-pub_date')
-    paginator = Paginator(posts, NUM_OF_P)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = group.posts.with_related()
+    page_obj = paginate(request, posts, NUM_OF_P)
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -34,13 +41,16 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@condition(etag_func=feed_etag)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all().order_by('-pub_date')
-    num_of_posts = posts.count()
-    paginator = Paginator(posts, NUM_OF_P)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    posts = author.posts.with_related()
+    stats = get_user_stats(author)
+    page_obj = paginate(
+        request, posts, NUM_OF_P, count=stats.posts_count
+    )
     if request.user.is_authenticated:
         following = Follow.objects.filter(
             user=request.user, author=author).exists()
@@ -49,21 +59,53 @@ def profile(request, username):
     context = {
         'author': author,
         'page_obj': page_obj,
-        'num_of_posts': num_of_posts,
+        'num_of_posts': stats.posts_count,
+        'stats': stats,
         'following': following,
         'request_user': request.user,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@condition(etag_func=feed_etag)
+def search(request):
+    form = SearchForm(request.GET or None)
+    page_obj = None
+    if form.is_valid() and form.cleaned_data['q']:
+        posts = Post.objects.with_related()
+        if form.cleaned_data['group']:
+            posts = posts.filter(group=form.cleaned_data['group'])
+        if form.cleaned_data['author']:
+            posts = posts.filter(
+                author__username=form.cleaned_data['author']
+            )
+        posts = search_posts(form.cleaned_data['q'], posts)
+        page_obj = CursorPaginator(
+            posts, NUM_OF_P, SEARCH_ORDERING
+        ).get_page(request.GET.get('cursor'))
+        for post in page_obj:
+            post.highlighted = highlight(post.snippet)
+    context = {
+        'form': form,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@condition(etag_func=feed_etag, last_modified_func=post_last_modified)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.with_related().select_related('author__stats'),
+        pk=post_id,
+    )
     author = post.author
-    num_of_posts = author.posts.count()
+    num_of_posts = get_user_stats(author).posts_count
     title = post.text
     form = CommentForm(
         request.POST or None)
-    comments = post.comments.all()
+    comments = comments_paginator(
+        request, post.comments.with_related(), COMMENTS_PER_PAGE
+    ).get_page(request.GET.get('cursor'))
     context = {
         'title': title,
         'post': post,
@@ -75,6 +117,20 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+@condition(etag_func=feed_etag, last_modified_func=post_last_modified)
+def post_comments(request, post_id):
+    """Следующая страница комментариев — фрагмент для подгрузки."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = comments_paginator(
+        request, post.comments.with_related(), COMMENTS_PER_PAGE
+    ).get_page(request.GET.get('cursor'))
+    context = {
+        'post': post,
+        'comments': comments,
+    }
+    return render(request, 'includes/comments.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -84,6 +140,7 @@ def post_create(request):
         form = form.save(commit=False)
         form.author = request.user
         form.save()
+        thumbnails.schedule(form.image)
         return redirect('posts:profile', username=request.user.username)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -99,7 +156,9 @@ def post_edit(request, post_id):
         files=request.FILES or None,
     )
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post.image)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'form': form,
@@ -124,13 +183,13 @@ def add_comment(request, post_id):
 @login_required
 def follow_index(request):
     title = 'Ваши последние обновления'
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, NUM_OF_P)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = timeline_page(request, NUM_OF_P)
     context = {
         'title': title,
         'page_obj': page_obj,
+        'timeline_version': get_generation(
+            generation_name(request.user.pk)
+        ),
     }
     return render(request, 'posts/follow.html', context)
 
@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -50,6 +51,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.SlowQueryLogMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -74,6 +77,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.feed_cache.feed_cache',
             ],
         },
     },
@@ -81,17 +85,53 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+ASGI_APPLICATION = 'yatube.asgi.application'
+
+# Асинхронные представления для чтения (имеет смысл только под ASGI).
+ASYNC_VIEWS = os.getenv('YATUBE_ASYNC_VIEWS') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Соединение живёт CONN_MAX_AGE секунд и проверяется перед запросом.
+# IMMEDIATE: транзакция сразу берёт блокировку записи и ждёт её
+# busy_timeout, а не падает, повышая блокировку чтения.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.getenv('YATUBE_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Прагмы, которые core.sqlite выполняет на каждом новом соединении.
+# default — умолчания SQLite: journal_mode сохраняется в файле базы,
+# поэтому возврат к нему тоже требует прагмы.
+SQLITE_PROFILES = {
+    'default': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+    },
+    'wal': {
+        'journal_mode': 'WAL',
+        # С WAL при сбое питания теряются только последние транзакции,
+        # база остаётся целой.
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        # Отрицательное значение — в КиБ: 64 МБ страничного кэша.
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    },
+}
+
+SQLITE_PROFILE = os.getenv('YATUBE_SQLITE_PROFILE', 'wal')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -140,7 +180,11 @@ LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма уходят через очередь задач; отправляет их воркер бэкендом
+# QUEUED_EMAIL_BACKEND.
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+
+QUEUED_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
@@ -148,16 +192,146 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
+# Бэкенд кэша выбирается переменной окружения YATUBE_CACHE. Для нескольких
+# воркеров на одном хосте нужен общий кэш: YATUBE_CACHE=sqlite.
+CACHE_BACKENDS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'sqlite': {
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'MAX_SIZE': 256 * 1024 * 1024,
+        },
+    },
+}
+
+CACHES = {
+    'default': CACHE_BACKENDS[os.getenv('YATUBE_CACHE', 'locmem')],
 }
 
+# Фрагменты лент сбрасываются сменой поколения (core.cache), поэтому
+# в общем кэше TTL может быть большим. Кэш в памяти процесса смену
+# поколения в другом воркере не видит: там TTL короткий
+# (core.cache.feed_timeout).
+FEED_CACHE_TIMEOUT = 60 * 60 * 6
+
+FEED_CACHE_LOCAL_TIMEOUT = 20
+
+# Сколько секунд держится в кэше число записей длинной ленты
+# (posts.utils.FeedPaginator).
+FEED_COUNT_TIMEOUT = 60
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
 
+# Метрики запросов (core.metrics). Подробные замеры (SQL, шаблоны, кэш)
+# делаются для доли запросов METRICS_SAMPLE_RATE: запрос в выборке стоит
+# около 25 мкс плюс 1 мкс на SQL-запрос и обращение к кэшу, вне выборки —
+# около 9 мкс. /metrics открыт по заголовку Authorization: Bearer
+# METRICS_TOKEN, а без токена — только INTERNAL_IPS и только в DEBUG.
+METRICS_SAMPLE_RATE = float(os.getenv('YATUBE_METRICS_SAMPLE_RATE', '0.1'))
+
+# Каталог, через который процессы складывают счётчики для /metrics
+# (по файлу на процесс). Без него каждый процесс отдаёт только свои.
+METRICS_DIR = os.getenv('YATUBE_METRICS_DIR') or None
+
+METRICS_FLUSH_INTERVAL = 10
+
+METRICS_TOKEN = os.getenv('YATUBE_METRICS_TOKEN')
+
+# SQL-запросы дольше SLOW_QUERY_THRESHOLD миллисекунд пишутся в
+# logs/slow_queries.log с планом выполнения (core.slow_queries); None
+# выключает журнал — YATUBE_SLOW_QUERY_MS=off или пустое значение.
+slow_query_ms = os.getenv('YATUBE_SLOW_QUERY_MS', '100').strip()
+SLOW_QUERY_THRESHOLD = (
+    None if slow_query_ms.lower() in ('', 'off') else float(slow_query_ms)
+)
+
+SLOW_QUERY_LOG_RATE = 60
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'core.log_handlers.RotatingFileHandler',
+            'filename': os.path.join(BASE_DIR, 'logs', 'slow_queries.log'),
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'encoding': 'utf-8',
+            'delay': True,
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'yatube.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 DEFAULT_AUTO_FIELD='django.db.models.AutoField'
+
+# Лента подписок: посты авторов, у которых подписчиков больше
+# TIMELINE_FANOUT_LIMIT, не раскладываются по лентам при публикации,
+# а подмешиваются при чтении.
+TIMELINE_FANOUT_LIMIT = 1000
+
+TIMELINE_BACKFILL_SIZE = 500
+
+TIMELINE_BATCH_SIZE = 1000
+
+# Загруженные картинки уменьшаются до IMAGE_MAX_DIMENSION пикселей по
+# большей стороне и перекодируются в первый формат из IMAGE_FORMATS,
+# который поддерживает Pillow (core.images).
+IMAGE_MAX_DIMENSION = 2048
+
+IMAGE_FORMATS = ['WEBP', 'JPEG']
+
+IMAGE_QUALITY = 85
+
+# Варианты картинок для srcset: ширины превью в пикселях и атрибут
+# sizes. Квадратный (crop) вариант выводится в размере наименьшей
+# ширины, остальные тянутся по ширине колонки. Все превью создаются
+# задачей очереди после загрузки картинки (core.thumbnails).
+IMAGE_VARIANTS = {
+    'card': {
+        'widths': [200, 400],
+        'crop': True,
+        'sizes': '200px',
+    },
+    'detail': {
+        'widths': [320, 640, 960, 1280],
+        'crop': False,
+        'sizes': '(min-width: 768px) 75vw, 100vw',
+    },
+}
+
+# Очередь задач core.tasks; выполняет их manage.py run_worker. Воркер —
+# отдельный процесс: готовые превью сайт находит в KVStore в базе,
+# а смену поколений кэша видит только с общим кэшем (YATUBE_CACHE=sqlite).
+TASKS_MAX_ATTEMPTS = 5
+
+# Секунды до повторного выполнения задачи, которую воркер забрал, но не
+# выполнил: он упал или завис.
+TASKS_VISIBILITY_TIMEOUT = 300
+
+# Задержка перед первым повтором в секундах; дальше удваивается.
+TASKS_RETRY_DELAY = 10
+
+TASKS_MAX_RETRY_DELAY = 3600
+
+TASKS_POLL_INTERVAL = 1
+
+TASKS_CLAIM_CANDIDATES = 10